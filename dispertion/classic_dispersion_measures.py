@@ -3,23 +3,25 @@
 # - standard deviation
 # - mean absolute deviation
 
-import math
+from dispertion.moment_accumulator import MomentAccumulator
 
 
 class ClassicDispersionMeasures(object):
 
+    def moments(self, population):
+        """ Single pass over the population, `population` may also be an already filled accumulator """
+        if isinstance(population, MomentAccumulator):
+            return population
+        return MomentAccumulator.from_values(population)
+
     def variance(self, population):
-        squared_diff_sum = 0.0
-        mean = self.mean(population)
-        for current in population:
-            squared_diff_sum += math.pow(current - mean, 2)
-        return squared_diff_sum / len(population)
+        return self.moments(population).variance()
 
     def standard_deviation(self, population):
-        return math.sqrt(self.variance(population))
+        return self.moments(population).standard_deviation()
 
     def coefficient_of_variation(self, population):
-        return self.standard_deviation(population) / self.mean(population)
+        return self.moments(population).coefficient_of_variation()
 
     def mean_absolute_deviation(self, population):
         absolute_deviations_sum = 0.0
@@ -34,8 +36,9 @@ class ClassicDispersionMeasures(object):
 
 # tests
 
-classic_dispersion_measures = ClassicDispersionMeasures()
-print('variance \t\t\t\t\t' + str(classic_dispersion_measures.variance([40, 42, 47, 53, 54, 59, 65])))
-print('standard deviation \t\t\t' + str(classic_dispersion_measures.standard_deviation([40, 42, 47, 53, 54, 59, 65])))
-print('mean absolute deviation \t' + str(classic_dispersion_measures.mean_absolute_deviation([40, 42, 47, 53, 54, 59, 65])))
-print('coefficient of variation \t' + str(classic_dispersion_measures.coefficient_of_variation([40, 42, 47, 53, 54, 59, 65])))
+if __name__ == '__main__':
+    classic_dispersion_measures = ClassicDispersionMeasures()
+    print('variance \t\t\t\t\t' + str(classic_dispersion_measures.variance([40, 42, 47, 53, 54, 59, 65])))
+    print('standard deviation \t\t\t' + str(classic_dispersion_measures.standard_deviation([40, 42, 47, 53, 54, 59, 65])))
+    print('mean absolute deviation \t' + str(classic_dispersion_measures.mean_absolute_deviation([40, 42, 47, 53, 54, 59, 65])))
+    print('coefficient of variation \t' + str(classic_dispersion_measures.coefficient_of_variation([40, 42, 47, 53, 54, 59, 65])))
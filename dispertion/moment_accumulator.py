@@ -0,0 +1,110 @@
+# single-pass moments:
+# - count, mean
+# - sums of 2nd, 3rd and 4th powers of deviations from the mean (M2, M3, M4)
+# Update and merge formulas: P. Pébay, "Formulas for Robust, One-Pass Parallel Computation
+# of Covariances and Arbitrary-Order Statistical Moments", 2008
+
+import math
+
+import numpy as np
+
+
+class MomentAccumulator(object):
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, m3=0.0, m4=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.m3 = m3
+        self.m4 = m4
+
+    @classmethod
+    def from_values(cls, values):
+        accumulator = cls()
+        accumulator.update(values)
+        return accumulator
+
+    def add(self, value):
+        """ Single observation update """
+        n1 = self.count
+        n = n1 + 1
+        delta = value - self.mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term1 = delta * delta_n * n1
+
+        self.mean += delta_n
+        self.m4 += term1 * delta_n2 * (n * n - 3 * n + 3) + 6 * delta_n2 * self.m2 - 4 * delta_n * self.m3
+        self.m3 += term1 * delta_n * (n - 2) - 3 * delta_n * self.m2
+        self.m2 += term1
+        self.count = n
+        return self
+
+    def update(self, values):
+        """ Batch update, moments of `values` are computed with NumPy and merged in """
+        values = np.asarray(values, dtype=float).ravel()
+        if not values.size:
+            return self
+        mean = values.mean()
+        deviations = values - mean
+        squared = deviations * deviations
+        return self.merge(MomentAccumulator(values.size, float(mean), float(squared.sum()),
+                                            float((squared * deviations).sum()), float((squared * squared).sum())))
+
+    def merge(self, other):
+        """ Combine partial state of another (disjoint) part of the population into this one """
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.mean, self.m2, self.m3, self.m4 = other.count, other.mean, other.m2, other.m3, other.m4
+            return self
+
+        na, nb = self.count, other.count
+        n = na + nb
+        delta = other.mean - self.mean
+        delta2 = delta * delta
+
+        m4 = (self.m4 + other.m4
+              + delta2 * delta2 * na * nb * (na * na - na * nb + nb * nb) / (n * n * n)
+              + 6 * delta2 * (na * na * other.m2 + nb * nb * self.m2) / (n * n)
+              + 4 * delta * (na * other.m3 - nb * self.m3) / n)
+        m3 = (self.m3 + other.m3
+              + delta2 * delta * na * nb * (na - nb) / (n * n)
+              + 3 * delta * (na * other.m2 - nb * self.m2) / n)
+        m2 = self.m2 + other.m2 + delta2 * na * nb / n
+
+        self.count = n
+        self.mean += delta * nb / n
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        return self
+
+    def __add__(self, other):
+        return self.copy().merge(other)
+
+    def copy(self):
+        return MomentAccumulator(self.count, self.mean, self.m2, self.m3, self.m4)
+
+    def variance(self, is_sample=False):
+        return self.m2 / (self.count - int(is_sample))
+
+    def standard_deviation(self, is_sample=False):
+        return math.sqrt(self.variance(is_sample))
+
+    def coefficient_of_variation(self):
+        return self.standard_deviation() / self.mean
+
+    def central_moment(self, r):
+        assert 1 <= r <= 4
+        return (0.0, self.m2, self.m3, self.m4)[r - 1] / self.count
+
+    def standardized_moment(self, r):
+        return self.central_moment(r) / (self.standard_deviation() ** r)
+
+    def skewness(self):
+        return self.standardized_moment(3)
+
+    def kurtosis(self):
+        return self.standardized_moment(4)
+
+    def excess_kurtosis(self):
+        return self.kurtosis() - 3
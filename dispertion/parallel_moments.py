@@ -0,0 +1,107 @@
+# parallel moments:
+# - splits array or file into chunks
+# - computes partial MomentAccumulator states in worker threads (arrays) or processes (files),
+#   file workers read and parse their own part of the file
+# - merges them exactly into one state
+
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dispertion.moment_accumulator import MomentAccumulator
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def _describe_npy_range(task):
+    # Workers map the file themselves, only offsets are sent between processes
+    path, start, stop = task
+    return MomentAccumulator.from_values(np.load(path, mmap_mode='r')[start:stop])
+
+
+def _describe_csv_range(task):
+    # Workers read and parse their own byte range, a line belongs to the range it starts in
+    path, start, stop, column, delimiter = task
+    with open(path, 'rb') as file:
+        file.seek(max(start - 1, 0))
+        file.readline()  # Header, or the rest of a line started in the previous range
+        position = file.tell()
+        if position >= stop:
+            return MomentAccumulator()
+        data = file.read(stop - position)
+        if not data.endswith(b'\n'):
+            data += file.readline()
+    if not data.strip():
+        return MomentAccumulator()
+    values = pd.read_csv(io.BytesIO(data), delimiter=delimiter, header=None, usecols=[column])[column]
+    return MomentAccumulator.from_values(values.to_numpy(dtype=float))
+
+
+def _array_chunks(values, chunk_size):
+    for start in range(0, len(values), chunk_size):
+        yield values[start:start + chunk_size]
+
+
+def _csv_ranges(path, column, chunk_size, delimiter):
+    # Byte ranges of about `chunk_size` lines, estimated from the average line length at the beginning of the file
+    size = os.path.getsize(path)
+    with open(path, 'rb') as file:
+        file.readline()
+        sample = file.read(1 << 16)
+    line_length = len(sample) / max(sample.count(b'\n'), 1) or 1
+    step = max(int(chunk_size * line_length), 1)
+    return ((path, start, min(start + step, size), column, delimiter) for start in range(0, size, step))
+
+
+def _merge_partials(function, tasks, workers, executor_class=ProcessPoolExecutor):
+    result = MomentAccumulator()
+    if workers == 1:
+        for task in tasks:
+            result.merge(function(task))
+        return result
+
+    # At most two tasks per worker are in flight, so results do not pile up in memory
+    with executor_class(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(function, task))
+            if len(pending) >= 2 * workers:
+                result.merge(pending.popleft().result())
+        while pending:
+            result.merge(pending.popleft().result())
+    return result
+
+
+def parallel_describe(source, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, column=0, delimiter=','):
+    """
+    Moments of a large population computed by `workers` workers.
+
+    :param source: array-like of numbers (chunks are reduced in threads, NumPy releases the GIL), path to .npy
+        file (memory mapped by worker processes) or path to csv file (worker processes read and parse their own
+        byte ranges, so fields must not contain quoted line breaks; `column` selects the column by name or
+        position).
+    :param int workers: number of threads or processes, defaults to number of CPUs. With 1 everything runs
+        in the calling thread.
+    :param int chunk_size: number of values per task (estimated from line length for csv).
+    :return MomentAccumulator: merged state, usable with ClassicDispersionMeasures and
+        symmetry.standardized_central_moment.
+    """
+    assert chunk_size > 0
+    workers = workers or os.cpu_count() or 1
+
+    if isinstance(source, (str, os.PathLike)) and str(source).endswith('.npy'):
+        size = len(np.load(source, mmap_mode='r'))
+        tasks = ((source, start, min(start + chunk_size, size)) for start in range(0, size, chunk_size))
+        return _merge_partials(_describe_npy_range, tasks, workers)
+
+    if isinstance(source, (str, os.PathLike)):
+        if not isinstance(column, int):
+            column = list(pd.read_csv(source, delimiter=delimiter, nrows=0).columns).index(column)
+        return _merge_partials(_describe_csv_range, _csv_ranges(source, column, chunk_size, delimiter), workers)
+
+    chunks = _array_chunks(np.asarray(source, dtype=float).ravel(), chunk_size)
+    return _merge_partials(MomentAccumulator.from_values, chunks, workers, ThreadPoolExecutor)
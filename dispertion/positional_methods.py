@@ -1,25 +1,105 @@
 # positional methods
 # - interquartile range (IQR, midspread, H-spread)
+# - median, quartiles and arbitrary percentiles
+# Order statistics are selected with introselect (numpy.partition), so input does not have to be
+# sorted and no full sort is done. All statistics needed at once are selected from a single copy.
+# With approximate=True, population may be an unbounded stream, which is summarized by a QuantileSketch.
+
+import itertools
+
+import numpy as np
+
+from dispertion.quantile_sketch import DEFAULT_K, QuantileSketch
+
+STREAM_CHUNK_SIZE = 1 << 16
 
 
 class PositionalMethods(object):
 
-    def iqr(self, population):
-        middle_index = (len(population) - 1) // 2
+    def iqr(self, population, approximate=False):
+        if approximate:
+            q1, q3 = self.sketch(population).quantiles([0.25, 0.75])
+            return float(q3 - q1)
+        q1, _, q3 = self.quartiles(population)
+        return q3 - q1
+
+    def median(self, population, approximate=False):
+        if approximate:
+            return self.sketch(population).quantile(0.5)
+        indices = self._median_indices(0, len(population) - 1)
+        return self._average(self.order_statistics(population, indices), indices)
 
-        if len(population) % 2 == 0:
-            q1 = self.median_from_to(population, 0, middle_index)
-            q3 = self.median_from_to(population, middle_index + 1, len(population) - 1)
+    def sketch(self, population, k=DEFAULT_K):
+        """ QuantileSketch of population, which may be an array, any iterable (consumed in chunks)
+            or already filled sketch (e.g. merged from shards)
+        """
+        if isinstance(population, QuantileSketch):
+            return population
+        sketch = QuantileSketch(k)
+        if isinstance(population, np.ndarray):
+            return sketch.update(population)
+        iterator = iter(population)
+        for chunk in iter(lambda: list(itertools.islice(iterator, STREAM_CHUNK_SIZE)), []):
+            sketch.update(chunk)
+        return sketch
+
+    def quartiles(self, population):
+        """ Q1, median and Q3, quartiles are medians of lower and upper half (median excluded for odd size) """
+        size = len(population)
+        middle_index = (size - 1) // 2
+
+        if size % 2 == 0:
+            q1 = self._median_indices(0, middle_index)
         else:
-            q1 = self.median_from_to(population, 0, middle_index - 1)
-            q3 = self.median_from_to(population, middle_index + 1, len(population) - 1)
+            q1 = self._median_indices(0, middle_index - 1)
+        q2 = self._median_indices(0, size - 1)
+        q3 = self._median_indices(middle_index + 1, size - 1)
 
-        return q3 - q1
+        values = self.order_statistics(population, q1 + q2 + q3)
+        return tuple(self._average(values, indices) for indices in (q1, q2, q3))
+
+    def percentiles(self, population, percents):
+        """ Percentiles (0-100) with linear interpolation between closest ranks """
+        percents = np.asarray(percents, dtype=float)
+        assert np.all((0 <= percents) & (percents <= 100))
+
+        positions = percents / 100 * (len(population) - 1)
+        lower = np.floor(positions).astype(int)
+        upper = np.ceil(positions).astype(int)
+        values = self.order_statistics(population, np.concatenate((lower.ravel(), upper.ravel())))
 
-    def median(self, population):
-        return self.median_from_to(population, 0, len(population) - 1)
+        lower_values = np.array([values[index] for index in lower.ravel()], dtype=float).reshape(lower.shape)
+        upper_values = np.array([values[index] for index in upper.ravel()], dtype=float).reshape(upper.shape)
+        return lower_values + (upper_values - lower_values) * (positions - lower)
+
+    def percentile(self, population, percent):
+        return float(self.percentiles(population, [percent])[0])
+
+    def order_statistics(self, population, indices):
+        """ {index: value at that index in sorted population}
+
+            Partitions a single copy of population around the middle requested index, then selects
+            remaining indices only in the part left or right of it, so the work stays O(n).
+        """
+        values = np.array(population, copy=True)
+        indices = sorted(set(int(index) for index in indices))
+        selected = {}
+
+        def _select(begin, end, wanted):
+            if not wanted:
+                return
+            middle = len(wanted) // 2
+            index = wanted[middle]
+            values[begin:end].partition(index - begin)
+            selected[index] = values[index].item()
+            _select(begin, index, wanted[:middle])
+            _select(index + 1, end, wanted[middle + 1:])
+
+        _select(0, len(values), indices)
+        return selected
 
     def median_from_to(self, population, index_from, index_to):
+        """ Median of already sorted part of population """
         size = index_to - index_from
         middle_index = size // 2
         if size % 2 == 0:
@@ -27,17 +107,35 @@ class PositionalMethods(object):
         else:
             return (population[index_from + middle_index] + population[index_from + middle_index + 1]) / 2.0
 
+    @staticmethod
+    def _average(values, indices):
+        if len(indices) == 1:
+            return values[indices[0]]
+        return (values[indices[0]] + values[indices[1]]) / 2.0
+
+    @staticmethod
+    def _median_indices(index_from, index_to):
+        size = index_to - index_from
+        middle_index = index_from + size // 2
+        if size % 2 == 0:
+            return (middle_index,)
+        return (middle_index, middle_index + 1)
+
 
 # tests
 
-positional_methods = PositionalMethods()
-print('q1 \t\t' + str(positional_methods.median_from_to([7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177], 0, 5)))
-print('q2 \t\t' + str(positional_methods.median([7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177])))
-print('q3 \t\t' + str(positional_methods.median_from_to([7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177], 7, 12)))
-print('iqr \t' + str(positional_methods.iqr([7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177])))
-
-positional_methods = PositionalMethods()
-print('q1 \t\t' + str(positional_methods.median_from_to([1, 3, 7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177, 198], 0, 7)))
-print('q2 \t\t' + str(positional_methods.median([1, 3, 7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177, 198])))
-print('q3 \t\t' + str(positional_methods.median_from_to([1, 3, 7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177, 198], 8, 15)))
-print('iqr \t' + str(positional_methods.iqr([1, 3, 7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177, 198])))
+if __name__ == '__main__':
+    positional_methods = PositionalMethods()
+    print('q1 \t\t' + str(positional_methods.median_from_to([7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177], 0, 5)))
+    print('q2 \t\t' + str(positional_methods.median([7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177])))
+    print('q3 \t\t' + str(positional_methods.median_from_to([7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177], 7, 12)))
+    print('iqr \t' + str(positional_methods.iqr([7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177])))
+
+    positional_methods = PositionalMethods()
+    print('q1 \t\t' + str(positional_methods.median_from_to([1, 3, 7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177, 198], 0, 7)))
+    print('q2 \t\t' + str(positional_methods.median([1, 3, 7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177, 198])))
+    print('q3 \t\t' + str(positional_methods.median_from_to([1, 3, 7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177, 198], 8, 15)))
+    print('iqr \t' + str(positional_methods.iqr([1, 3, 7, 7, 31, 31, 47, 75, 87, 115, 116, 119, 119, 155, 177, 198])))
+
+    print('iqr (unsorted) \t' + str(positional_methods.iqr([119, 7, 177, 31, 87, 7, 115, 47, 155, 31, 116, 75, 119])))
+    print('percentiles \t' + str(positional_methods.percentiles([119, 7, 177, 31, 87, 7, 115, 47, 155, 31, 116, 75, 119], [10, 50, 90])))
@@ -0,0 +1,55 @@
+# Binomial distribution
+# - probabilities are computed in log space (log-gamma), so no factorials overflow and no products underflow
+# - tails sum only the terms within about ten standard deviations of the bound, the rest is below double precision
+
+import math
+import numpy as np
+from scipy.special import gammaln, logsumexp
+
+from distributions.NormalDistribution import NormalDistribution
+
+# Number of standard deviations (plus constant) of the tail that is summed, farther terms are below e^-50 of the largest
+_TAIL_WINDOW_SIGMAS = 10
+_TAIL_WINDOW_MIN = 50
+
+_STANDARD_NORMAL = NormalDistribution()
+
+
+class Binomial:
+    """ Number of successes in n independent trials with success probability p """
+
+    @staticmethod
+    def log_pmf(k, n, p=0.5):
+        k = np.asarray(k, dtype=float)
+        return gammaln(n + 1) - gammaln(k + 1) - gammaln(n - k + 1) + k * math.log(p) + (n - k) * math.log1p(-p)
+
+    @staticmethod
+    def pmf(k, n, p=0.5):
+        return float(np.exp(Binomial.log_pmf(k, n, p)))
+
+    @staticmethod
+    def log_cdf(k, n, p=0.5):
+        """ log P(X <= k) """
+        k = math.floor(k)
+        if k < 0:
+            return -math.inf
+        if k >= n:
+            return 0.0
+        if k > n * p:
+            # Largest terms are above k, so the complement of the upper tail is summed instead
+            return math.log1p(-math.exp(Binomial.log_cdf(n - k - 1, n, 1 - p)))
+        window = _TAIL_WINDOW_SIGMAS * math.sqrt(n * p * (1 - p)) + _TAIL_WINDOW_MIN
+        terms = np.arange(max(0, k - math.ceil(window)), k + 1)
+        return min(0.0, float(logsumexp(Binomial.log_pmf(terms, n, p))))
+
+    @staticmethod
+    def cdf(k, n, p=0.5, exact=True):
+        """ P(X <= k), exact or normal approximation with continuity correction """
+        if not exact:
+            return float(_STANDARD_NORMAL.cdf((math.floor(k) + 0.5 - n * p) / math.sqrt(n * p * (1 - p))))
+        return math.exp(Binomial.log_cdf(k, n, p))
+
+    @staticmethod
+    def sf(k, n, p=0.5, exact=True):
+        """ P(X >= k), computed as lower tail of failures to keep precision far in the upper tail """
+        return Binomial.cdf(n - math.ceil(k), n, 1 - p, exact)
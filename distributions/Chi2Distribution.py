@@ -2,12 +2,280 @@
 from typing import Callable, Tuple
 
 import math
-from scipy.integrate import quad
+import numpy as np
+from scipy.special import gammaln
 
-def _lower_incomplete_gamma_func(s: float, x: float) -> float:
-    def _func(t: float) -> float:
-        return (t ** (s-1)) * math.exp(-t)
-    return quad(_func, 0, x)[0]
+from distributions.NormalDistribution import _standard_normal_ppf
+
+_EPS = np.finfo(float).eps
+_TINY = np.finfo(float).tiny
+_MAX_ITERATIONS = 100000
+_PPF_ITERATIONS = 200
+
+
+def _gamma_series(s: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """ Series expansion of lower incomplete gamma, converges fast for x < s + 1.
+        Returns sum without the exp(-x) * x^s / gamma(s) prefactor.
+    """
+    term = 1.0 / s
+    total = term.copy()
+    ap = s.copy()
+    active = np.arange(s.size)
+    for _ in range(_MAX_ITERATIONS):
+        ap[active] += 1.0
+        term[active] *= x[active] / ap[active]
+        total[active] += term[active]
+        active = active[np.abs(term[active]) >= np.abs(total[active]) * _EPS]
+        if not active.size:
+            break
+    return total
+
+
+def _gamma_continued_fraction(s: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """ Continued fraction (modified Lentz) of upper incomplete gamma, converges fast for x >= s + 1.
+        Returns fraction without the exp(-x) * x^s / gamma(s) prefactor.
+    """
+    b = x + 1.0 - s
+    c = np.full_like(x, 1.0 / _TINY)
+    d = 1.0 / b
+    h = d.copy()
+    active = np.arange(s.size)
+    for i in range(1, _MAX_ITERATIONS):
+        an = -i * (i - s[active])
+        b[active] += 2.0
+        d_active = an * d[active] + b[active]
+        d_active[np.abs(d_active) < _TINY] = _TINY
+        c_active = b[active] + an / c[active]
+        c_active[np.abs(c_active) < _TINY] = _TINY
+        d[active] = 1.0 / d_active
+        c[active] = c_active
+        delta = d[active] * c_active
+        h[active] *= delta
+        active = active[np.abs(delta - 1.0) >= _EPS]
+        if not active.size:
+            break
+    return h
+
+
+def _log_regularized_gamma(s: np.ndarray, x: np.ndarray, log_x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Logarithms of regularized lower and upper incomplete gamma log P(s, x), log Q(s, x) for broadcast arrays.
+        Each point uses whichever of series/continued fraction converges fast there, and the
+        complement is taken from it so that both tails keep their precision. Far tails do not underflow,
+        and `log_x` is passed separately, so x may underflow to 0 while log x is finite.
+    """
+    s, x, log_x = np.broadcast_arrays(np.asarray(s, dtype=float), np.asarray(x, dtype=float),
+                                      np.asarray(log_x, dtype=float))
+    log_lower = np.full(s.shape, -np.inf)
+    log_upper = np.zeros(s.shape)
+
+    positive = (log_x > -np.inf) & (x < np.inf)
+    series = positive & (x < s + 1.0)
+    fraction = positive & ~series
+    log_lower[x == np.inf] = 0.0
+    log_upper[x == np.inf] = -np.inf
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore', under='ignore'):
+        if series.any():
+            ss, xs = s[series], x[series]
+            log_prefactor = -xs + ss * log_x[series] - gammaln(ss)
+            log_lower[series] = np.minimum(log_prefactor + np.log(_gamma_series(ss, xs)), 0.0)
+            log_upper[series] = np.log1p(-np.exp(log_lower[series]))
+        if fraction.any():
+            sf, xf = s[fraction], x[fraction]
+            log_prefactor = -xf + sf * log_x[fraction] - gammaln(sf)
+            log_upper[fraction] = np.minimum(log_prefactor + np.log(_gamma_continued_fraction(sf, xf)), 0.0)
+            log_lower[fraction] = np.log1p(-np.exp(log_upper[fraction]))
+
+    invalid = np.isnan(s) | np.isnan(x) | (s <= 0.0)
+    log_lower[invalid] = np.nan
+    log_upper[invalid] = np.nan
+    return log_lower, log_upper
+
+
+def _regularized_gamma(s: np.ndarray, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Regularized lower and upper incomplete gamma P(s, x), Q(s, x) for broadcast arrays """
+    x = np.asarray(x, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_lower, log_upper = _log_regularized_gamma(s, x, np.log(x))
+    return np.exp(log_lower), np.exp(log_upper)
+
+
+def _quantile(tail: np.ndarray, k: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """ x with P( X > x ) = tail where `upper` and P( X ≤ x ) = tail elsewhere, for 0 < tail ≤ 0.5.
+
+        Newton iterations on u = log x, as log of the lower tail is almost linear in u, safeguarded by
+        bisection. Small-x expansion (x/2)^(k/2) / Γ(k/2 + 1) bounds P( X ≤ x ) from above, so where it equals
+        P( X ≤ x ) at the root it gives a lower bound of the root, iterates beyond the root give upper bounds.
+        Start is Wilson-Hilferty approximation or the expansion, whichever is larger.
+        NaN where iterations do not converge.
+    """
+    s = k / 2
+    log_tail = np.log(tail)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore', under='ignore'):
+        z = np.where(upper, -1.0, 1.0) * _standard_normal_ppf(tail)
+        log_wilson_hilferty = np.log(k) + 3 * np.log(1 - 2 / (9 * k) + z * np.sqrt(2 / (9 * k)))
+        log_lower_probability = np.where(upper, np.log1p(-tail), log_tail)
+        low = (log_lower_probability + np.log(s) + gammaln(s)) / s + math.log(2.0)
+        high = np.full(low.shape, np.inf)
+        u = np.fmax(log_wilson_hilferty, low)
+
+        active = np.flatnonzero(np.isfinite(u))
+        previous_step = np.full(u.shape, np.inf)
+        for _ in range(_PPF_ITERATIONS):
+            if not active.size:
+                break
+            s_, u_, upper_ = s[active], u[active], upper[active]
+            half_x = np.exp(u_) / 2
+            log_half_x = u_ - math.log(2.0)
+            log_lower, log_upper = _log_regularized_gamma(s_, half_x, log_half_x)
+            # Excess of the tail over target, increasing in u
+            excess = np.where(upper_, log_tail[active] - log_upper, log_lower - log_tail[active])
+            # d log P( X ≤ x ) / du = x pdf(x) / P( X ≤ x ), x pdf(x) = (x/2)^(k/2) e^(-x/2) / Γ(k/2)
+            log_x_pdf = s_ * log_half_x - half_x - gammaln(s_)
+            slope = np.exp(log_x_pdf - np.where(upper_, log_upper, log_lower))
+            low[active] = np.where(excess < 0, u_, low[active])
+            high[active] = np.where(excess > 0, u_, high[active])
+
+            new_u = u_ - excess / slope
+            outside = ~((new_u >= low[active]) & (new_u <= high[active]))
+            new_u = np.where(outside, (low[active] + high[active]) / 2, new_u)
+            u[active] = new_u
+            step = np.abs(new_u - u_)
+            # For large k precision of the tails limits the attainable accuracy, stop once steps stop shrinking
+            converged = (step <= 1e-13) | (excess == 0) | ((step >= previous_step[active]) & (step <= 1e-8))
+            previous_step[active] = step
+            active = active[~converged]
+        u[active] = np.nan
+        return np.exp(u)
+
+
+def _regularized_gamma_scalar(s: float, x: float) -> Tuple[float, float]:
+    """ Same as `_regularized_gamma` for plain floats, without NumPy per-call overhead """
+    if math.isnan(s) or math.isnan(x) or s <= 0.0:
+        return math.nan, math.nan
+    if x <= 0.0:
+        return 0.0, 1.0
+    if x == math.inf:
+        return 1.0, 0.0
+    prefactor = math.exp(-x + s * math.log(x) - math.lgamma(s))
+    if x < s + 1.0:
+        term = total = 1.0 / s
+        ap = s
+        for _ in range(_MAX_ITERATIONS):
+            ap += 1.0
+            term *= x / ap
+            total += term
+            if abs(term) < abs(total) * _EPS:
+                break
+        lower = min(prefactor * total, 1.0)
+        return lower, 1.0 - lower
+
+    b = x + 1.0 - s
+    c = 1.0 / _TINY
+    d = 1.0 / b
+    h = d
+    for i in range(1, _MAX_ITERATIONS):
+        an = -i * (i - s)
+        b += 2.0
+        d = an * d + b
+        if abs(d) < _TINY:
+            d = _TINY
+        c = b + an / c
+        if abs(c) < _TINY:
+            c = _TINY
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < _EPS:
+            break
+    upper = min(prefactor * h, 1.0)
+    return 1.0 - upper, upper
+
+
+class Chi2:
+    """ Vectorized chi2 distribution. `x` and `degree_of_freedom` may be scalars or NumPy arrays
+        and are broadcast against each other.
+    """
+
+    @staticmethod
+    def pdf(x, degree_of_freedom) -> np.ndarray:
+        x, k = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(degree_of_freedom, dtype=float))
+        half_k = k / 2
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore', under='ignore'):
+            log_pdf = (half_k - 1) * np.log(x) - x / 2 - half_k * np.log(2.0) - gammaln(half_k)
+            result = np.where((x > 0.0) & (x < np.inf), np.exp(log_pdf), 0.0)
+        # Density at 0 is finite only for k >= 2
+        result = np.where((x == 0.0) & (k == 2), 0.5, result)
+        result = np.where((x == 0.0) & (k < 2), np.inf, result)
+        return result
+
+    @staticmethod
+    def cdf(x, degree_of_freedom) -> np.ndarray:
+        return Chi2.distribution(x, degree_of_freedom)[0]
+
+    @staticmethod
+    def sf(x, degree_of_freedom) -> np.ndarray:
+        return Chi2.distribution(x, degree_of_freedom)[1]
+
+    @staticmethod
+    def distribution(x, degree_of_freedom) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Calculates cdf, sf and pdf in a single pass over the inputs
+
+            :return tuple: P( X ≤ x ), P( X > x ), probability density( x )
+        """
+        if np.ndim(x) == 0 and np.ndim(degree_of_freedom) == 0:
+            return Chi2._scalar_distribution(float(x), float(degree_of_freedom))
+        x = np.asarray(x, dtype=float)
+        k = np.asarray(degree_of_freedom, dtype=float)
+        cdf, sf = _regularized_gamma(k / 2, x / 2)
+        return cdf, sf, Chi2.pdf(x, k)
+
+    @staticmethod
+    def ppf(p, degree_of_freedom):
+        """ Percent point function (inverse of cdf).
+
+            Newton iterations on the logarithm of the tail closer to `p`, see `_quantile`.
+            NaN for degrees of freedom ≤ 0 and where iterations do not converge.
+        """
+        return Chi2._inverse(p, degree_of_freedom, upper_tail=False)
+
+    @staticmethod
+    def isf(q, degree_of_freedom):
+        """ Inverse survival function, x with P( X > x ) = q.
+
+            Unlike ppf(1 - q) keeps its precision for small q, as used for critical values.
+        """
+        return Chi2._inverse(q, degree_of_freedom, upper_tail=True)
+
+    @staticmethod
+    def _inverse(p, degree_of_freedom, upper_tail: bool):
+        scalar = np.ndim(p) == 0 and np.ndim(degree_of_freedom) == 0
+        p, k = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(degree_of_freedom, dtype=float))
+        shape = p.shape
+        p, k = p.ravel(), k.ravel()
+
+        # Iterations run on the tail below 1/2, upper where it is the one `p` is given for
+        upper = (p <= 0.5) == upper_tail
+        x = np.zeros(p.shape)
+        valid = (p > 0) & (p < 1) & (k > 0)
+        x[valid] = _quantile(np.minimum(p, 1.0 - p)[valid], k[valid], upper[valid])
+
+        x[p == (1.0 if upper_tail else 0.0)] = 0.0
+        x[p == (0.0 if upper_tail else 1.0)] = np.inf
+        x[np.isnan(p) | (p < 0) | (p > 1) | np.isnan(k) | (k <= 0)] = np.nan
+        x = x.reshape(shape)
+        return float(x) if scalar else x
+
+    @staticmethod
+    def _scalar_distribution(x: float, k: float) -> Tuple[float, float, float]:
+        cdf, sf = _regularized_gamma_scalar(k / 2, x / 2)
+        if x > 0.0 and x != math.inf:
+            pdf = math.exp((k / 2 - 1) * math.log(x) - x / 2 - k / 2 * math.log(2.0) - math.lgamma(k / 2))
+        elif x == 0.0 and k <= 2:
+            pdf = 0.5 if k == 2 else math.inf
+        else:
+            pdf = 0.0
+        return cdf, sf, pdf
 
 
 def chi2_distribution_function(degree_of_freedom: int) -> Tuple[Callable[[float], float],
@@ -16,22 +284,30 @@ def chi2_distribution_function(degree_of_freedom: int) -> Tuple[Callable[[float]
         at specified point
     """
     def _pdf(x: float) -> float:
-        if x < 0.0:
-            return 0.0
-        num = (x ** (degree_of_freedom/2 - 1)) * math.exp(-x / 2)
-        den = (2 ** (degree_of_freedom/2)) * math.gamma(degree_of_freedom/2)
-        return num / den
+        return Chi2._scalar_distribution(float(x), float(degree_of_freedom))[2]
 
     def _cdf(x: float) -> float:
-        if x < 0.0:
-            return 0.0
-        return (_lower_incomplete_gamma_func(degree_of_freedom / 2, x / 2) 
-                / math.gamma(degree_of_freedom / 2))
+        return Chi2._scalar_distribution(float(x), float(degree_of_freedom))[0]
 
     return _pdf, _cdf
 
 def chi2_distribution(x: float, degree_of_freedom: int) -> Tuple[float, float, float, float]:
-    pdf, cdf = chi2_distribution_function(degree_of_freedom)
-    cdf_x = cdf(x)
+    cdf_x, sf_x, pdf_x = Chi2._scalar_distribution(float(x), float(degree_of_freedom))
+
+    return cdf_x, sf_x, cdf_x, pdf_x
+
+
+if __name__ == '__main__':
+    # Example
+    print(chi2_distribution(3.94, 10))
 
-    return cdf_x, 1-cdf_x, cdf_x, pdf(x)
\ No newline at end of file
+    # Deep tails against reference values (mpmath, 50 digits)
+    cases = [(Chi2.ppf, 0.05, 10, 3.9402991361190601),
+             (Chi2.ppf, 1e-100, 300, 26.562082851099887),
+             (Chi2.ppf, 1e-300, 1000, 103.2656981758432),
+             (Chi2.isf, 0.05, 10, 18.307038053275147),
+             (Chi2.isf, 1e-17, 3, 82.27020108712503),
+             (Chi2.isf, 1e-300, 1, 1373.8726312223941)]
+    for function, p, k, expected in cases:
+        assert math.isclose(function(p, k), expected, rel_tol=1e-10), (function.__name__, p, k)
+        assert math.isclose(function(np.array([p]), k)[0], expected, rel_tol=1e-10), (function.__name__, p, k)
@@ -0,0 +1,103 @@
+# Critical values cache shared by hypothesis tests
+# Process-wide cache is persisted to the JSON file named by CRITICAL_VALUES_CACHE environment variable
+# (or set with CRITICAL_VALUES.configure), it is loaded on import and saved at exit
+
+import atexit
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+import numpy as np
+
+
+def _plain(value):
+    """ Built-in int/float of NumPy scalar, so keys compare equal after JSON round trip and can be saved """
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class CriticalValueCache:
+    """ Bounded LRU cache of critical values.
+
+        Values are keyed by (distribution, alpha, tail, *parameters), e.g. ('t', 0.05, 'two tailed', 9),
+        and computed by the supplied function on miss only. The cache can be saved to and loaded from
+        a JSON file, so percent point function root finding is not repeated between runs.
+    """
+
+    def __init__(self, maxsize: int = 4096, path: Optional[str] = None):
+        assert maxsize > 0
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def configure(self, path: Optional[str]):
+        """ Set file the cache is saved to, entries already in it are loaded. None turns persistence off """
+        self.path = path
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def get(self, distribution: str, alpha: float, tail: str, parameters: Tuple[Hashable, ...],
+            compute: Callable[[], float]) -> float:
+        key = (distribution, float(alpha), tail, *(_plain(parameter) for parameter in parameters))
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                self._values.move_to_end(key)
+                return self._values[key]
+            self.misses += 1
+
+        value = float(compute())
+
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+        return value
+
+    def statistics(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._values), 'maxsize': self.maxsize}
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        assert path, "path of cache file must be given"
+        with self._lock:
+            entries = [[list(key), value] for key, value in self._values.items()]
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(entries, file)
+
+    def load(self, path: Optional[str] = None):
+        path = path or self.path
+        assert path, "path of cache file must be given"
+        with open(path, 'r', encoding='utf-8') as file:
+            entries = json.load(file)
+        with self._lock:
+            for key, value in entries:
+                self._values[tuple(key)] = value
+                self._values.move_to_end(tuple(key))
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+
+# Process-wide cache used by TailTest, SnedecorsFDistribution and chi2 independence test
+CRITICAL_VALUES = CriticalValueCache(path=os.environ.get('CRITICAL_VALUES_CACHE') or None)
+
+
+@atexit.register
+def _save_critical_values():
+    if CRITICAL_VALUES.path is not None:
+        CRITICAL_VALUES.save()
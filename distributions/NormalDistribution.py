@@ -1,7 +1,117 @@
 # Stanisław Zakrzewski 29/01/2022 - normal distribution
 
 import math
+import numpy as np
 from scipy.integrate import quad
+from scipy.special import erfc
+
+# Coefficients of rational approximations of the standard normal quantile (P. J. Acklam)
+_PPF_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+          1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_PPF_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+          6.680131188771972e+01, -1.328068155288572e+01)
+_PPF_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+          -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_PPF_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+          3.754408661907416e+00)
+_PPF_P_LOW = 0.02425
+
+
+def _polynomial(coefficients, x):
+    result = np.zeros_like(x)
+    for coefficient in coefficients:
+        result = result * x + coefficient
+    return result
+
+
+def _standard_normal_ppf(p):
+    """
+    Quantile of standard normal distribution for an array of probabilities.
+
+    Rational approximation (relative error 1.15e-9) refined with a single Halley step,
+    which brings it to full double precision.
+    """
+    p = np.asarray(p, dtype=float)
+    x = np.empty_like(p)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        low = p < _PPF_P_LOW
+        high = p > 1 - _PPF_P_LOW
+        central = ~(low | high)
+
+        q = np.sqrt(-2 * np.log(p[low]))
+        x[low] = _polynomial(_PPF_C, q) / (_polynomial(_PPF_D, q) * q + 1)
+
+        q = np.sqrt(-2 * np.log1p(-p[high]))
+        x[high] = -_polynomial(_PPF_C, q) / (_polynomial(_PPF_D, q) * q + 1)
+
+        q = p[central] - 0.5
+        r = q * q
+        x[central] = _polynomial(_PPF_A, r) * q / (_polynomial(_PPF_B, r) * r + 1)
+
+        # Halley refinement, error is measured on the tail closer to p to keep precision
+        upper = p > 0.5
+        error = np.where(upper, (1 - p) - 0.5 * erfc(x / math.sqrt(2)), 0.5 * erfc(-x / math.sqrt(2)) - p)
+        u = error * math.sqrt(2 * math.pi) * np.exp(x * x / 2)
+        refined = x - u / (1 + x * u / 2)
+        x = np.where(np.isfinite(refined), refined, x)
+
+    x[p == 0] = -math.inf
+    x[p == 1] = math.inf
+    x[(p < 0) | (p > 1) | np.isnan(p)] = math.nan
+    return x
+
+
+class NormalDistribution:
+    """
+    Vectorized normal distribution.
+
+    All methods accept scalars or NumPy arrays. `mean` and `standard_deviation`
+    may be arrays as well and are broadcast against the arguments.
+    """
+
+    def __init__(self, mean=0.0, standard_deviation=1.0):
+        self.mean = np.asarray(mean, dtype=float)
+        self.standard_deviation = np.asarray(standard_deviation, dtype=float)
+
+    def z_score(self, x):
+        return (np.asarray(x, dtype=float) - self.mean) / self.standard_deviation
+
+    def pdf(self, x):
+        """
+        Probability density function.
+        """
+        z = self.z_score(x)
+        return np.exp(-0.5 * z * z) / (math.sqrt(2 * math.pi) * self.standard_deviation)
+
+    def cdf(self, x):
+        """
+        P( X ≤ x )
+        """
+        return 0.5 * erfc(-self.z_score(x) / math.sqrt(2))
+
+    def sf(self, x):
+        """
+        P( X > x ), computed directly so right tail keeps its precision.
+        """
+        return 0.5 * erfc(self.z_score(x) / math.sqrt(2))
+
+    def ppf(self, p):
+        """
+        Percent point function (inverse of cdf).
+        """
+        return self.mean + self.standard_deviation * _standard_normal_ppf(p)
+
+    def interval_probability(self, lower, upper):
+        """
+        P( lower ≤ X ≤ upper )
+        """
+        z_lower = self.z_score(lower)
+        z_upper = self.z_score(upper)
+        # Difference of the tails closer to the interval avoids cancellation far from the mean
+        return np.where(z_lower > 0,
+                        0.5 * (erfc(z_lower / math.sqrt(2)) - erfc(z_upper / math.sqrt(2))),
+                        0.5 * (erfc(-z_upper / math.sqrt(2)) - erfc(-z_lower / math.sqrt(2))))
 
 
 def probability_for_normal_distribution(normal_distribution, z):
@@ -38,15 +148,15 @@ def normal_distribution(x, mean, standard_deviation):
         Probability density( x )
     """
 
-    nd = normal_distribution_function(mean, standard_deviation)
-    zs = z_score(x, mean, standard_deviation)
-    p1 = probability_for_normal_distribution(nd, zs)
+    nd = NormalDistribution(mean, standard_deviation)
+    p1 = float(nd.cdf(x))
     p2 = 1 - p1
     p3 = abs(abs(p1) - abs(p2))
-    pd = nd(x)
+    pd = float(nd.pdf(x))
 
     return p1, p2, p3, pd
 
 
-# Example
-print(normal_distribution(1, 0, 1))
+if __name__ == '__main__':
+    # Example
+    print(normal_distribution(1, 0, 1))
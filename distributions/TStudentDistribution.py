@@ -1,7 +1,354 @@
 # Stanisław Zakrzewski 30/01/2022 - t-student distribution
 
 import math
+import statistics
+import numpy as np
 from scipy.integrate import quad
+from scipy.special import betaln
+
+from distributions.NormalDistribution import NormalDistribution
+
+_EPS = np.finfo(float).eps
+_TINY = np.finfo(float).tiny
+_MAX_ITERATIONS = 10000
+_PPF_ITERATIONS = 200
+
+# Above this number of degrees of freedom t distribution is replaced with standard normal,
+# absolute error of cdf is then below 1e-7
+_NORMAL_APPROXIMATION_DF = 1e7
+# Above this number of degrees of freedom Cornish-Fisher expansion alone is accurate enough for ppf
+_CORNISH_FISHER_DF = 1e4
+# Up to this number of degrees of freedom ppf iterates on log|t| from tail asymptote, as Cornish-Fisher
+# start is too far off in heavy tails
+_LOG_NEWTON_DF = 200
+
+# From this a on log B(a, 1/2) is computed from asymptotic series, betaln has relative error
+# about 1e-9 for a of order 1e6
+_LOG_BETA_SERIES_A = 20.0
+_LOG_SQRT_PI = 0.5 * math.log(math.pi)
+_LOG_MAX = math.log(np.finfo(float).max)
+
+_STANDARD_NORMAL = NormalDistribution()
+# Scalar normal quantile (Wichura AS241), without NumPy per-call overhead
+_STANDARD_NORMAL_SCALAR = statistics.NormalDist()
+
+
+def _log_beta_half_series(a, log_a):
+    # Asymptotic series of log B(a, 1/2), valid for floats and arrays
+    return _LOG_SQRT_PI - 0.5 * log_a + 1 / (8 * a) - 1 / (192 * a ** 3) + 1 / (640 * a ** 5) \
+        - 17 / (14336 * a ** 7)
+
+
+def _log_beta_half(a):
+    """
+    log B(a, 1/2) = log Γ(1/2) - (log Γ(a + 1/2) - log Γ(a)) for floats and arrays.
+    """
+    if np.ndim(a) == 0:
+        return _log_beta_half_series(a, math.log(a)) if a >= _LOG_BETA_SERIES_A else float(betaln(a, 0.5))
+    a = np.asarray(a, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        series = _log_beta_half_series(a, np.log(a))
+    return np.where(a >= _LOG_BETA_SERIES_A, series, betaln(a, 0.5))
+
+
+def _beta_continued_fraction_terms(m, a, b, x):
+    """
+    Even and odd coefficients d_2m, d_2m+1 of the continued fraction, for floats and arrays.
+    """
+    m2 = 2 * m
+    return (m * (b - m) * x / ((a - 1.0 + m2) * (a + m2)),
+            -(a + m) * (a + b + m) * x / ((a + m2) * (a + 1.0 + m2)))
+
+
+def _beta_continued_fraction(a, b, x):
+    """
+    Continued fraction of regularized incomplete beta (modified Lentz) for arrays,
+    converges fast for x < (a + 1) / (a + b + 2).
+    """
+    c = np.ones_like(x)
+    d = 1.0 - (a + b) * x / (a + 1.0)
+    d[np.abs(d) < _TINY] = _TINY
+    d = 1.0 / d
+    h = d.copy()
+    active = np.arange(x.size)
+    for m in range(1, _MAX_ITERATIONS):
+        for aa in _beta_continued_fraction_terms(m, a[active], b[active], x[active]):
+            d_active = 1.0 + aa * d[active]
+            d_active[np.abs(d_active) < _TINY] = _TINY
+            c_active = 1.0 + aa / c[active]
+            c_active[np.abs(c_active) < _TINY] = _TINY
+            d[active] = 1.0 / d_active
+            c[active] = c_active
+            delta = d[active] * c_active
+            h[active] *= delta
+        active = active[np.abs(delta - 1.0) >= _EPS]
+        if not active.size:
+            break
+    return h
+
+
+def _beta_continued_fraction_scalar(a, b, x):
+    """
+    Same as `_beta_continued_fraction` for plain floats, without NumPy per-call overhead.
+    """
+    c = 1.0
+    d = 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) >= _TINY else _TINY)
+    h = d
+    for m in range(1, _MAX_ITERATIONS):
+        for aa in _beta_continued_fraction_terms(m, a, b, x):
+            d = 1.0 + aa * d
+            d = 1.0 / (d if abs(d) >= _TINY else _TINY)
+            c = 1.0 + aa / c
+            c = c if abs(c) >= _TINY else _TINY
+            delta = d * c
+            h *= delta
+        if abs(delta - 1.0) < _EPS:
+            break
+    return h
+
+
+def _lower_tail(t, df):
+    """
+    P( T ≤ -|t| ) for arrays, from regularized incomplete beta I_x(df/2, 1/2) with x = df / (df + t^2).
+    """
+    t, df = np.broadcast_arrays(np.abs(np.asarray(t, dtype=float)), np.asarray(df, dtype=float))
+    t, df = t.ravel(), df.ravel()
+    a = df / 2
+    b = np.full_like(a, 0.5)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore', under='ignore'):
+        t2 = t * t
+        x = df / (df + t2)
+        one_minus_x = 1.0 / (1.0 + df / t2)
+        # Logarithm of the smaller of x, 1 - x directly, of the other one with log1p of the smaller
+        log_x = np.where(x < 0.5, np.log(df) - 2 * np.log(t) - np.log1p(df / t2), np.log1p(-one_minus_x))
+        log_one_minus_x = np.where(x < 0.5, np.log1p(-x), np.log(one_minus_x))
+        log_front = a * log_x + b * log_one_minus_x - _log_beta_half(a)
+        front = np.exp(log_front)
+
+        result = np.full_like(t, 0.5)
+        direct = (t > 0) & (x < (a + 1) / (a + b + 2))
+        mirrored = (t > 0) & ~direct
+        if direct.any():
+            result[direct] = 0.5 * front[direct] * _beta_continued_fraction(
+                a[direct], b[direct], x[direct]) / a[direct]
+        if mirrored.any():
+            result[mirrored] = 0.5 * (1.0 - front[mirrored] * _beta_continued_fraction(
+                b[mirrored], a[mirrored], one_minus_x[mirrored]) / b[mirrored])
+    result[np.isinf(t)] = 0.0
+    result[np.isnan(t) | np.isnan(df) | (df <= 0)] = math.nan
+    return result
+
+
+def _lower_tail_scalar(t, df):
+    t = abs(t)
+    if math.isnan(t) or math.isnan(df) or df <= 0:
+        return math.nan
+    if t == 0:
+        return 0.5
+    if math.isinf(t):
+        return 0.0
+    a, b = df / 2, 0.5
+    t2 = t * t
+    x = df / (df + t2)
+    one_minus_x = 1.0 / (1.0 + df / t2)
+    if x < 0.5:
+        log_x, log_one_minus_x = math.log(df) - 2 * math.log(t) - math.log1p(df / t2), math.log1p(-x)
+    else:
+        log_x, log_one_minus_x = math.log1p(-one_minus_x), math.log(one_minus_x)
+    front = math.exp(a * log_x + b * log_one_minus_x - _log_beta_half(a))
+    if x < (a + 1) / (a + b + 2):
+        return 0.5 * front * _beta_continued_fraction_scalar(a, b, x) / a
+    return 0.5 * (1.0 - front * _beta_continued_fraction_scalar(b, a, one_minus_x) / b)
+
+
+def _log_pdf(t, df):
+    """
+    Logarithm of density for floats and arrays, t² / df is not formed for large |t| so it does not overflow.
+    """
+    if np.ndim(t) == 0 and np.ndim(df) == 0:
+        t = abs(t)
+        log1p_t2 = math.log1p(t * t / df) if t < 1e100 else 2 * math.log(t) - math.log(df) + math.log1p(df / (t * t))
+        return -_log_beta_half(df / 2) - 0.5 * math.log(df) - (df + 1) / 2 * log1p_t2
+    t = np.abs(t)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        log1p_t2 = np.where(t < 1e100, np.log1p(t * t / df), 2 * np.log(t) - np.log(df) + np.log1p(df / (t * t)))
+        return -_log_beta_half(df / 2) - 0.5 * np.log(df) - (df + 1) / 2 * log1p_t2
+
+
+def _cornish_fisher(z, df):
+    """
+    Cornish-Fisher expansion of t quantile around normal quantile z, for floats and arrays.
+    """
+    return z + (z ** 3 + z) / (4 * df) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2) \
+        + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3)
+
+
+def _log_newton_start(lower, df, t):
+    """
+    u = log(-t) to start Newton iterations from, for floats and arrays: the tail asymptote
+    df^(df/2 - 1) / B(df/2, 1/2) * |t|^-df, which is beyond the root, or the Cornish-Fisher `t` if it is closer.
+    Log of the tail is concave in u, so from either side iterations converge.
+    """
+    u = ((df / 2 - 1) * np.log(df) - _log_beta_half(df / 2) - np.log(lower)) / df
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.fmin(u, np.where(t < 0, np.log(-t), np.inf))
+
+
+def _log_newton_ppf(lower, df, t):
+    """
+    t with P( T ≤ t ) = lower < 0.5 for arrays. Newton iterations on u = log(-t), as log of the tail is
+    almost linear in u, starting from `_log_newton_start`. Quantiles beyond float range are -inf.
+    """
+    u = _log_newton_start(lower, df, t)
+    active = np.flatnonzero(u < _LOG_MAX)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore', under='ignore'):
+        for _ in range(_PPF_ITERATIONS):
+            if not active.size:
+                break
+            t, df_ = -np.exp(u[active]), df[active]
+            log_tail = np.log(_lower_tail(t, df_))
+            # d log P( T ≤ t ) / du = -pdf(t) |t| / P( T ≤ t )
+            step = (log_tail - np.log(lower[active])) / -np.exp(_log_pdf(t, df_) + u[active] - log_tail)
+            u[active] -= step
+            active = active[(np.abs(step) > 1e-14) & (u[active] < _LOG_MAX)]
+        return -np.exp(u)
+
+
+def _ppf_scalar(p, df):
+    """
+    Same as `TStudent.ppf` for plain floats, Newton iterations run on `_lower_tail_scalar`.
+    """
+    if math.isnan(p) or math.isnan(df) or p < 0 or p > 1 or df <= 0:
+        return math.nan
+    lower = min(p, 1.0 - p)
+    if lower == 0.5:
+        return 0.0
+    if lower == 0.0:
+        t = -math.inf
+    elif df > _NORMAL_APPROXIMATION_DF:
+        t = _STANDARD_NORMAL_SCALAR.inv_cdf(lower)
+    elif df == 1:
+        t = -1.0 / math.tan(math.pi * lower)
+    elif df == 2:
+        t = (2 * lower - 1) / math.sqrt(2 * lower * (1 - lower))
+    elif df <= _LOG_NEWTON_DF:
+        u = float(_log_newton_start(lower, df, _cornish_fisher(_STANDARD_NORMAL_SCALAR.inv_cdf(lower), df)))
+        for _ in range(_PPF_ITERATIONS):
+            if u >= _LOG_MAX:
+                break
+            tail = _lower_tail_scalar(-math.exp(u), df)
+            if tail == 0.0:
+                break
+            log_tail = math.log(tail)
+            step = (log_tail - math.log(lower)) / -math.exp(_log_pdf(math.exp(u), df) + u - log_tail)
+            u -= step
+            if abs(step) <= 1e-14:
+                break
+        t = -math.exp(u) if u < _LOG_MAX else -math.inf
+    else:
+        t = _cornish_fisher(_STANDARD_NORMAL_SCALAR.inv_cdf(lower), df)
+        if df <= _CORNISH_FISHER_DF:
+            for _ in range(_PPF_ITERATIONS):
+                step = (_lower_tail_scalar(t, df) - lower) / math.exp(_log_pdf(t, df))
+                t -= step
+                if abs(step) <= 1e-13 * abs(t):
+                    break
+    return -t if p > 0.5 else t
+
+
+class TStudent:
+    """
+    Vectorized Student's t distribution.
+
+    `x` and `degrees_of_freedom` may be scalars or NumPy arrays and are broadcast
+    against each other. Density uses log-gamma, so it does not overflow for large degrees of
+    freedom, and above `_NORMAL_APPROXIMATION_DF` standard normal distribution is used instead.
+    """
+
+    @staticmethod
+    def pdf(x, degrees_of_freedom):
+        """
+        Probability density function.
+        """
+        if np.ndim(x) == 0 and np.ndim(degrees_of_freedom) == 0:
+            x, df = float(x), float(degrees_of_freedom)
+            if df > _NORMAL_APPROXIMATION_DF:
+                return math.exp(-0.5 * x * x) / math.sqrt(2 * math.pi)
+            return math.exp(_log_pdf(x, df))
+
+        x, df = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(degrees_of_freedom, dtype=float))
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            return np.where(df > _NORMAL_APPROXIMATION_DF, _STANDARD_NORMAL.pdf(x), np.exp(_log_pdf(x, df)))
+
+    @staticmethod
+    def cdf(x, degrees_of_freedom):
+        """
+        P( T ≤ x )
+        """
+        return TStudent.sf(-np.asarray(x, dtype=float) if np.ndim(x) else -x, degrees_of_freedom)
+
+    @staticmethod
+    def sf(x, degrees_of_freedom):
+        """
+        P( T > x ), computed from the tail so small p-values keep their precision.
+        """
+        if np.ndim(x) == 0 and np.ndim(degrees_of_freedom) == 0:
+            x, df = float(x), float(degrees_of_freedom)
+            if df > _NORMAL_APPROXIMATION_DF:
+                return 0.5 * math.erfc(x / math.sqrt(2))
+            tail = _lower_tail_scalar(x, df)
+            return tail if x > 0 else 1.0 - tail
+
+        x, df = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(degrees_of_freedom, dtype=float))
+        tail = _lower_tail(x, df).reshape(x.shape)
+        result = np.where(x > 0, tail, 1.0 - tail)
+        return np.where(df > _NORMAL_APPROXIMATION_DF, _STANDARD_NORMAL.sf(x), result)
+
+    @staticmethod
+    def ppf(p, degrees_of_freedom):
+        """
+        Percent point function (inverse of cdf).
+
+        Closed form is used for 1 and 2 degrees of freedom, otherwise Newton iterations on the lower
+        tail, on log|t| from tail asymptote up to `_LOG_NEWTON_DF` degrees of freedom and on t from
+        Cornish-Fisher expansion of normal quantile above.
+        """
+        if np.ndim(p) == 0 and np.ndim(degrees_of_freedom) == 0:
+            return _ppf_scalar(float(p), float(degrees_of_freedom))
+
+        p, df = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(degrees_of_freedom, dtype=float))
+        shape = p.shape
+        p, df = p.ravel(), df.ravel()
+
+        lower = np.minimum(p, 1.0 - p)
+        z = _STANDARD_NORMAL.ppf(lower)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            t = _cornish_fisher(z, df)
+
+            iterate = (df > _LOG_NEWTON_DF) & (df <= _CORNISH_FISHER_DF) & (lower > 0) & (lower < 0.5)
+            active = np.flatnonzero(iterate)
+            for _ in range(_PPF_ITERATIONS):
+                if not active.size:
+                    break
+                step = (_lower_tail(t[active], df[active]) - lower[active]) / TStudent.pdf(t[active], df[active])
+                t[active] -= step
+                active = active[np.abs(step) > 1e-13 * np.abs(t[active])]
+
+            tail = (df > 0) & (df <= _LOG_NEWTON_DF) & (df != 1) & (df != 2) & (lower > 0) & (lower < 0.5)
+            t[tail] = _log_newton_ppf(lower[tail], df[tail], t[tail])
+
+            one = df == 1
+            t[one] = -1.0 / np.tan(np.pi * lower[one])
+            two = df == 2
+            t[two] = (2 * lower[two] - 1) / np.sqrt(2 * lower[two] * (1 - lower[two]))
+            t[df > _NORMAL_APPROXIMATION_DF] = z[df > _NORMAL_APPROXIMATION_DF]
+
+        t[lower == 0.5] = 0.0
+        t[lower == 0.0] = -math.inf
+        t = np.where(p > 0.5, -t, t)
+        t[np.isnan(p) | (p < 0) | (p > 1) | (df <= 0)] = math.nan
+        return t.reshape(shape)
 
 
 def probability_for_normal_distribution(t_student_distribution, x):
@@ -13,9 +360,7 @@ def z_score(x, mean, standard_deviation):
 
 
 def t_student_function(degrees_of_freedom):
-    return lambda x: math.gamma((degrees_of_freedom + 1) / 2) / (
-            math.gamma(degrees_of_freedom / 2) * math.sqrt(degrees_of_freedom * math.pi)) * (
-                             1 + x ** 2 / degrees_of_freedom) ** (-(degrees_of_freedom + 1) / 2)
+    return lambda x: TStudent.pdf(x, degrees_of_freedom)
 
 
 def t_student_distribution(x, degrees_of_freedom):
@@ -36,7 +381,7 @@ def t_student_distribution(x, degrees_of_freedom):
     """
 
     ts = t_student_function(degrees_of_freedom)
-    p1 = probability_for_normal_distribution(ts, x)
+    p1 = TStudent.cdf(x, degrees_of_freedom)
     p2 = 1 - p1
     p3 = abs(abs(p1) - abs(p2))
     pd = ts(x)
@@ -44,5 +389,23 @@ def t_student_distribution(x, degrees_of_freedom):
     return p1, p2, p3, pd
 
 
-# Example
-print(t_student_distribution(1, 2))
+if __name__ == '__main__':
+    # Example
+    print(t_student_distribution(1, 2))
+
+    # Extreme tails and large or fractional degrees of freedom against reference values (mpmath, 50 digits)
+    cases = [(TStudent.sf, 5.0, 1.3e6, 2.8668874180853498e-7),
+             (TStudent.sf, 1e-3, 1.3e6, 0.49960105786280864),
+             (TStudent.cdf, -2.4e6, 1.5, 1.0141978243196264e-10),
+             (TStudent.cdf, -1e160, 1.5, 3.7708524320162463e-241),
+             (TStudent.cdf, -1e200, 0.5, 3.2070097541422291e-101),
+             (TStudent.cdf, -30.0, 1e4, 1.0221635237127853e-189),
+             (TStudent.ppf, 0.975, 0.5, 164.55767348048851),
+             (TStudent.ppf, 0.975, 1.5, 6.0166631044279317),
+             (TStudent.ppf, 0.025, 3, -3.1824463052837095),
+             (TStudent.ppf, 1e-10, 250, -6.6347441723499583),
+             (TStudent.ppf, 1e-100, 5, -1.5683925590993378e+20),
+             (TStudent.ppf, 1e-300, 101, -9090.1916992480054)]
+    for function, x, df, expected in cases:
+        assert math.isclose(function(x, df), expected, rel_tol=1e-10), (function.__name__, x, df)
+        assert math.isclose(function(np.array([x]), df)[0], expected, rel_tol=1e-10), (function.__name__, x, df)
@@ -0,0 +1,91 @@
+# Wilcoxon signed-rank statistic distribution
+# - exact for small samples without ties, counts of rank subsets are built by dynamic programming once per n
+# - normal approximation with tie correction otherwise
+
+import functools
+import math
+import numpy as np
+
+from distributions.NormalDistribution import NormalDistribution
+from functions.ranking import tie_correction
+
+# Up to this sample size (and without ties) p-values are exact
+_EXACT_MAX_N = 50
+
+_STANDARD_NORMAL = NormalDistribution()
+
+
+@functools.lru_cache(maxsize=64)
+def _exact_cdf(n):
+    """ P(W+ <= w) for w = 0..n(n+1)/2 under H0, read-only.
+        Each rank k is in the positive sum with probability 1/2, so the distribution of W+ is
+        the distribution for n - 1 averaged with itself shifted by k.
+    """
+    probabilities = np.zeros(n * (n + 1) // 2 + 1)
+    probabilities[0] = 1.0
+    for k in range(1, n + 1):
+        top = k * (k + 1) // 2 + 1
+        shifted = probabilities[:top - k].copy()
+        probabilities[:top] *= 0.5
+        probabilities[k:top] += 0.5 * shifted
+    cdf = np.minimum(np.cumsum(probabilities), 1.0)
+    cdf.setflags(write=False)
+    return cdf
+
+
+class WilcoxonSignedRank:
+    """ Distribution of W+, the sum of ranks of positive differences among n nonzero differences """
+
+    @staticmethod
+    def mean(n):
+        return n * (n + 1) / 4
+
+    @staticmethod
+    def variance(n, tie_sizes=None):
+        """ Variance under H0, reduced by sum(t^3 - t) / 48 over groups of tied absolute differences """
+        variance = n * (n + 1) * (2 * n + 1) / 24
+        if tie_sizes is not None:
+            variance -= tie_correction(tie_sizes) / 48
+        return variance
+
+    @staticmethod
+    def cdf(w, n):
+        """ Exact P(W+ <= w) """
+        cdf = _exact_cdf(n)
+        w = np.floor(np.asarray(w, dtype=float))
+        result = cdf[np.clip(w, 0, cdf.size - 1).astype(int)]
+        return np.where(w < 0, 0.0, result)
+
+    @staticmethod
+    def sf(w, n):
+        """ Exact P(W+ >= w), from symmetry of W+ around n(n+1)/4 """
+        return WilcoxonSignedRank.cdf(n * (n + 1) // 2 - np.ceil(np.asarray(w, dtype=float)), n)
+
+    @staticmethod
+    def p_value(w_plus, n, tie_sizes=None, tail='two tailed', exact=None):
+        """
+        P-value of observed W+.
+
+        :param tie_sizes: sizes of groups of tied absolute differences (as returned by functions.ranking.rank).
+        :param tail: 'two tailed', 'left tailed' (differences shifted down) or 'right tailed' (shifted up).
+        :param exact: exact distribution or normal approximation, by default exact for n <= 50 without ties.
+        """
+        assert tail in ('two tailed', 'left tailed', 'right tailed')
+        assert n > 0
+        if exact is None:
+            exact = n <= _EXACT_MAX_N and (tie_sizes is None or np.all(np.asarray(tie_sizes) == 1))
+
+        if exact:
+            left = WilcoxonSignedRank.cdf(w_plus, n)
+            right = WilcoxonSignedRank.sf(w_plus, n)
+        else:
+            z = (np.asarray(w_plus, dtype=float) - WilcoxonSignedRank.mean(n)) \
+                / math.sqrt(WilcoxonSignedRank.variance(n, tie_sizes))
+            left = _STANDARD_NORMAL.cdf(z)
+            right = _STANDARD_NORMAL.sf(z)
+
+        if tail == 'left tailed':
+            return left
+        if tail == 'right tailed':
+            return right
+        return np.minimum(1.0, 2 * np.minimum(left, right))
@@ -1,37 +1,53 @@
 # Lukasz Pierscieniewski 6/2/2022 - Pearson Chi2 Test
-from distributions.Chi2Distribution import chi2_distribution
-from typing import List, Tuple
-
-def pearson_chi2_test(theoretical_dist: List[int],
-                      empirical_dist: List[int]) -> Tuple[float, float]:
-    assert len(theoretical_dist) == len(empirical_dist), \
+from distributions.Chi2Distribution import Chi2
+from functions.data_loader import encode_categories
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def pearson_chi2_tests(theoretical_dist, empirical_dist,
+                       estimated_parameters: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """ Pearson chi2 goodness of fit tests, one per row of 2D theoretical and empirical count matrices.
+        Theoretical counts are rescaled to the empirical population of their row.
+        Degrees of freedom are number of classes - 1 - `estimated_parameters`.
+    """
+    theoretical_dist = np.asarray(theoretical_dist, dtype=float)
+    empirical_dist = np.asarray(empirical_dist, dtype=float)
+    assert theoretical_dist.shape == empirical_dist.shape, \
         "Lenght of class intervals for both theoretical and empirical data must be the same."
 
-    chi2_sum = 0.0
-    theoretical_population = sum(theoretical_dist)
-    empirical_population = sum(empirical_dist)
-    for theoretical, empirical in zip(theoretical_dist, 
-                                      empirical_dist):
-        probability_of_theoretical = theoretical / theoretical_population
-        chi2_sum += ((empirical - empirical_population * probability_of_theoretical) 
-                     / (empirical_population * probability_of_theoretical))
-    p_value = chi2_distribution(chi2_sum, len(theoretical_dist) - 2)[1]
-
+    expected = empirical_dist.sum(axis=-1, keepdims=True) * theoretical_dist \
+        / theoretical_dist.sum(axis=-1, keepdims=True)
+    chi2_sum = np.sum((empirical_dist - expected) ** 2 / expected, axis=-1)
+    p_value = Chi2.sf(chi2_sum, theoretical_dist.shape[-1] - 1 - estimated_parameters)
     return chi2_sum, p_value
 
-import pandas as pd
 
-def load_data_from_csv(filename: str) -> Tuple[List[int], List[int]]:
-    df = pd.read_csv(filename, delimiter=',')
-
-    print(df)
+def pearson_chi2_test(theoretical_dist: List[int],
+                      empirical_dist: List[int]) -> Tuple[float, float]:
+    chi2_sum, p_value = pearson_chi2_tests(theoretical_dist, empirical_dist)
+    return float(chi2_sum), float(p_value)
 
-    result_expected = []
-    result_observed = []
-    for i, k in enumerate(df["value"].unique()):
-        expected_count = df[(df["value"] == k) & (df["type"] == "expected")]["type"].count()
-        observed_count = df[(df["value"] == k) & (df["type"] == "observed")]["type"].count()
+import pandas as pd
 
-        result_expected.append(expected_count)
-        result_observed.append(observed_count)
-    return result_expected, result_observed
\ No newline at end of file
+def load_data_from_csv(filename: str, chunk_size: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """ Expected and observed counts of each value, values in order of first appearance.
+        File is read in chunks of `chunk_size` rows if given, counts are accumulated with bincount.
+    """
+    chunks = pd.read_csv(filename, delimiter=',', usecols=["type", "value"], chunksize=chunk_size)
+    if chunk_size is None:
+        chunks = [chunks]
+
+    values = {}
+    result_expected = np.zeros(0, dtype=np.int64)
+    result_observed = np.zeros(0, dtype=np.int64)
+    for chunk in chunks:
+        codes = encode_categories(chunk["value"], values)
+        types = chunk["type"].to_numpy()
+
+        result_expected = np.pad(result_expected, (0, len(values) - result_expected.size))
+        result_observed = np.pad(result_observed, (0, len(values) - result_observed.size))
+        result_expected += np.bincount(codes[(types == "expected") & (codes >= 0)], minlength=len(values))
+        result_observed += np.bincount(codes[(types == "observed") & (codes >= 0)], minlength=len(values))
+    return result_expected, result_observed
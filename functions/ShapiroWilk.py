@@ -1,82 +1,65 @@
 # Lukasz Pierscieniewski 6/2/2022 - ShapiroWilk normality test
 # Based on https://scistatcalc.blogspot.com/2013/10/shapiro-wilk-test-testing-for-normality.html
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
+import functools
 import math
+import numpy as np
+
+from distributions.NormalDistribution import NormalDistribution
+
+_STANDARD_NORMAL = NormalDistribution()
+
+# Memory-mapped precomputed weights, see `build_weight_store` and `use_weight_store`
+_weight_store = None
+_weight_store_offsets = None
 
 def _norm_dist_cdf(x: float, mean: float, stddev:float) -> float:
         """ Fast, accurate way to calculate cdf"""
         return 0.5 * (1 + math.erf((x - mean) / (math.sqrt(2) * stddev)))
 
 
-def _inverse_gaussian_cdf(p: float, mean: float, stddev: float) -> float:
-    """ CDF is monotonically increasing so using binsearch to find correct value
-        :param p float: Value P(X < x) for which we want to find x
-        :param mean float: Mean of distribution we calculate
-        :param stddev float: Stddev of distribution
-        :return float: Value x such as P(X < x) = p
-    """
-    
-    x = mean
-    if _norm_dist_cdf(x, mean, stddev) < p:
-        range_beg, range_end = x, x
-        while _norm_dist_cdf(range_end, mean, stddev) < p:
-            range_end += stddev
-    else:
-        range_beg, range_end = x, x
-        while _norm_dist_cdf(range_beg, mean, stddev) >= p:
-            range_beg -= stddev
-
-    for _ in range(1000): # That should be way enough iters to estimate accurately
-        range_mean = 0.5 * (range_beg + range_end)
-        if _norm_dist_cdf(range_mean, mean, stddev) < p:
-            range_beg = range_mean
-        else:
-            range_end = range_mean
-    return range_mean
+def _shapiro_wilk_test_p_value(w_statistic: float, n_samples: int) -> float:
+    return float(_shapiro_wilk_test_p_values(np.array([w_statistic]), n_samples)[0])
 
 
-def _shapiro_wilk_test_p_value(w_statistic: float, n_samples: int) -> float:
+def _shapiro_wilk_test_p_values(w_statistics: np.ndarray, n_samples: int) -> np.ndarray:
+    """ P-values of an array of W statistics of equally sized samples (Royston's approximation) """
     c3 = [0.5440e0, -0.39978e0, 0.25054e-1, -0.6714e-3]
     c4 = [0.13822e1, -0.77857e0, 0.62767e-1, -0.20322e-2]
     c5 = [-0.15861e1, -0.31082e0, -0.83751e-1, 0.38915e-2]
     c6 = [-0.4803e0, -0.82676e-1, 0.30302e-2]
 
+    w_statistics = np.asarray(w_statistics, dtype=float)
     if n_samples == 3:
-        return max(0.0, (math.pi / 6) * (math.asin(math.sqrt(w_statistic)) - math.sqrt(0.75)))
-    if n_samples <= 11:
-        gma = 0.459 * n_samples + -0.2273e-1
-        if math.log(1 - w_statistic) > gma:
-            return 1e-19
-        
-        y = -math.log(gma - math.log(1 - w_statistic))
-        m = sum((w * n_samples**i for i, w in enumerate(c3)))
-        s = math.exp(sum((w * n_samples**i for i, w in enumerate(c4))))
-        
-        return 1 - _norm_dist_cdf((y - m) / s, 0, 1)
-    else:
-        n_samples = math.log(n_samples)
-        y = math.log(1 - w_statistic)
-        m = sum((w * n_samples**i for i, w in enumerate(c5)))
-        s = math.exp(sum((w * n_samples**i for i, w in enumerate(c6))))
-
-        return 1 - _norm_dist_cdf((y - m) / s, 0, 1)
-
+        return np.maximum(0.0, (6 / math.pi) * (np.arcsin(np.sqrt(w_statistics)) - math.asin(math.sqrt(0.75))))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_w = np.log(1 - w_statistics)
+        if n_samples <= 11:
+            gma = 0.459 * n_samples + -0.2273e1
+            y = -np.log(gma - log_w)
+            m = sum((w * n_samples**i for i, w in enumerate(c3)))
+            s = math.exp(sum((w * n_samples**i for i, w in enumerate(c4))))
+        else:
+            log_n = math.log(n_samples)
+            y = log_w
+            m = sum((w * log_n**i for i, w in enumerate(c5)))
+            s = math.exp(sum((w * log_n**i for i, w in enumerate(c6))))
+        p_values = _STANDARD_NORMAL.sf((y - m) / s)
 
-def shapiro_wilk_test(samples: List[int]) -> Tuple[float, float]:
-    n_samples = len(samples)
+    if n_samples <= 11:
+        p_values = np.where(log_w > gma, 1e-19, p_values)
+    return p_values
 
-    avg_samples = sum(samples) / n_samples
-    stddev = math.sqrt((1 / (n_samples-1)) * sum(((x-avg_samples)*(x-avg_samples) 
-                                                  for x in samples)))
 
-    m = [_inverse_gaussian_cdf((i - (3 / 8)) / (n_samples + 0.25), 0.0, 1.0)
-         for i in range(1, n_samples+1)]
-    sum_m2 = sum([x**2 for x in m])
-    w = [x / math.sqrt(sum_m2) for x in m]
+def _compute_shapiro_wilk_weights(n_samples: int) -> np.ndarray:
+    m = _STANDARD_NORMAL.ppf((np.arange(1, n_samples + 1) - (3 / 8)) / (n_samples + 0.25))
+    sum_m2 = m @ m
+    w = m / math.sqrt(sum_m2)
 
     if n_samples == 3:
-        w = [math.sqrt(0.5), 0.0, -math.sqrt(0.5)]
+        w = np.array([math.sqrt(0.5), 0.0, -math.sqrt(0.5)])
     if n_samples > 3:
         u = 1 / math.sqrt(n_samples)
         y = -2.706056 * u ** 5 + 4.434687 * u ** 4 + -2.071190 * u ** 3 \
@@ -86,9 +69,7 @@ def shapiro_wilk_test(samples: List[int]) -> Tuple[float, float]:
 
         if n_samples == 4 or n_samples == 5:
             phi = (sum_m2 - (2 * m[-1] ** 2)) / (1 - (2 * w[-1] ** 2))
-
-            for i in range(1, n_samples-1):
-                w[i] = m[i] / math.sqrt(phi)
+            w[1:-1] = m[1:-1] / math.sqrt(phi)
         else:
             z = -3.582633 * u**5 + 5.682633 * u**4 + -1.752461 * u**3 \
                 + -0.293762 * u**2 + 0.042981 * u + w[n_samples-2]
@@ -96,7 +77,77 @@ def shapiro_wilk_test(samples: List[int]) -> Tuple[float, float]:
             w[1] = -z
 
             phi = (sum_m2 - (2*m[-1]**2) - (2*m[-2]**2)) / (1-(2*w[-1]**2)-(2*w[-2]**2))
-            for i in range(2, n_samples-2):
-                w[i] = m[i] / math.sqrt(phi)
-    W = sum((wi * x for wi, x in zip(w, sorted(samples))))**2 / (stddev * (n_samples-1))
-    return W, _shapiro_wilk_test_p_value(W, n_samples)
\ No newline at end of file
+            w[2:-2] = m[2:-2] / math.sqrt(phi)
+    return w
+
+
+def _weight_store_layout(max_n: int) -> np.ndarray:
+    """ Offsets of weights for n = 3..max_n in store, only first n // 2 (negative) weights are
+        stored as the rest follows from antisymmetry
+    """
+    return np.concatenate(([0], np.cumsum(np.arange(3, max_n + 1) // 2)))
+
+
+def build_weight_store(path: str, max_n: int = 5000) -> None:
+    """ Precompute weights for all sample sizes 3..max_n into .npy file """
+    assert max_n >= 3
+    offsets = _weight_store_layout(max_n)
+    store = np.lib.format.open_memmap(path, mode='w+', dtype=float, shape=(int(offsets[-1]),))
+    for n_samples in range(3, max_n + 1):
+        store[offsets[n_samples - 3]:offsets[n_samples - 2]] = _compute_shapiro_wilk_weights(n_samples)[:n_samples // 2]
+    store.flush()
+    del store
+
+
+def use_weight_store(path: Optional[str]) -> None:
+    """ Memory-map weight store built by `build_weight_store`, None stops using it """
+    global _weight_store, _weight_store_offsets
+    if path is None:
+        _weight_store, _weight_store_offsets = None, None
+    else:
+        store = np.load(path, mmap_mode='r')
+        # Store holds about max_n ** 2 / 4 weights, layout up to a safe upper bound locates its end
+        offsets = _weight_store_layout(2 * math.isqrt(store.size) + 4)
+        max_n = int(np.searchsorted(offsets, store.size)) + 2
+        assert offsets[max_n - 2] == store.size, "file is not a weight store"
+        _weight_store, _weight_store_offsets = store, offsets[:max_n - 1]
+    _shapiro_wilk_weights.cache_clear()
+
+
+@functools.lru_cache(maxsize=256)
+def _shapiro_wilk_weights(n_samples: int) -> np.ndarray:
+    """ Coefficients of sorted samples in W statistic, they depend on sample size only.
+        Taken from weight store if one is used and covers `n_samples`, computed otherwise.
+        Returned array is shared between calls, so it is read-only.
+    """
+    if _weight_store is not None and 3 <= n_samples < len(_weight_store_offsets) + 2:
+        half = _weight_store[_weight_store_offsets[n_samples - 3]:_weight_store_offsets[n_samples - 2]]
+        w = np.concatenate((half, np.zeros(n_samples % 2), -half[::-1]))
+    else:
+        w = _compute_shapiro_wilk_weights(n_samples)
+
+    w.setflags(write=False)
+    return w
+
+
+def shapiro_wilk_test(samples: List[int]) -> Tuple[float, float]:
+    samples = np.sort(np.asarray(samples, dtype=float))
+    n_samples = samples.size
+
+    deviations = samples - samples.mean()
+    W = float((_shapiro_wilk_weights(n_samples) @ samples) ** 2 / (deviations @ deviations))
+    return W, _shapiro_wilk_test_p_value(W, n_samples)
+
+
+def shapiro_wilk_batch(matrix: np.ndarray, axis: int = -1) -> Tuple[np.ndarray, np.ndarray]:
+    """ Shapiro-Wilk test of every sample in `matrix`, samples lie along `axis` and are of equal size.
+        Returns arrays of W statistics and p-values with `axis` removed from the shape.
+    """
+    samples = np.sort(np.asarray(matrix, dtype=float), axis=axis)
+    samples = np.moveaxis(samples, axis, -1)
+    n_samples = samples.shape[-1]
+
+    deviations = samples - samples.mean(axis=-1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        W = (samples @ _shapiro_wilk_weights(n_samples)) ** 2 / np.einsum('...i,...i->...', deviations, deviations)
+    return W, _shapiro_wilk_test_p_values(W, n_samples)
@@ -1,47 +1,72 @@
 # Jacek Wolski 26/01/2022 - sign test for mean value 
 
 
-import csv
-import math
+import os
 
-def sign_test_mean(csv_file='data\SignTestMean.csv'):
+import numpy as np
+
+from distributions.BinomialDistribution import Binomial
+from functions.data_loader import DATA_DIRECTORY, iter_test_data, load_test_data
+
+
+def sign_counts(values, mean=0.0):
+    """ Numbers of values above, below and equal to `mean` (NaN values are not counted) """
+    differences = np.asarray(values, dtype=float) - mean
+    positive = int(np.count_nonzero(differences > 0))
+    negative = int(np.count_nonzero(differences < 0))
+    zeros = int(np.count_nonzero(differences == 0))
+    return positive, negative, zeros
+
+
+def sign_test_from_counts(positive, negative, zeros=0, exact=True):
+    """ Sign test from counts of signs, see `sign_test` """
+    n = positive + negative
+    if n:
+        left = Binomial.cdf(positive, n, 0.5, exact)
+        right = Binomial.sf(positive, n, 0.5, exact)
+    else:
+        left, right = 1.0, 1.0
+    return {'positive': positive, 'negative': negative, 'zeros': zeros, 'n': n,
+            'left tailed': left, 'right tailed': right, 'two tailed': min(1.0, 2 * min(left, right))}
+
+
+def sign_test(values, mean=0.0, exact=True):
+    """
+    Sign test of H0: median of values equals `mean`. Values equal to `mean` are dropped.
+
+    :param exact: binomial tails computed in log space, or normal approximation when False.
+    :return dict: counts of signs and p-values, 'left tailed' for H1: median < mean,
+        'right tailed' for H1: median > mean, and 'two tailed'.
+    """
+    return sign_test_from_counts(*sign_counts(values, mean), exact=exact)
+
+
+def sign_test_mean(csv_file=os.path.join(DATA_DIRECTORY, 'SignTestMean.csv'), chunk_size=None):
     print("Sign test for mean value.\nData file: " + csv_file)
-    rows = []
-    with open(csv_file, 'r',encoding = 'utf-8-sig') as file:
-        csvreader = csv.DictReader(file, delimiter =';')
-        mean_row = next(csvreader)
-        mean = float(mean_row['Data'])
-        alpha_row = next(csvreader)
-        alpha = float(alpha_row['Data'])
-        data_headers_row = next(csvreader)
-        for row in csvreader:
-            rows.append(row)
+    if chunk_size is None:
+        (mean_row, alpha_row, data_headers_row), data = load_test_data(csv_file, 3, ['Data'])
+        chunks = [data]
+    else:
+        (mean_row, alpha_row, data_headers_row), chunks = iter_test_data(csv_file, 3, chunk_size, ['Data'])
+    mean = float(mean_row['Data'])
+    alpha = float(alpha_row['Data'])
     print('Mean: ' + str(mean))
     print('Alpha: ' + str(alpha))
     print('Data headers: ' + data_headers_row['Desc'] + ' ' + data_headers_row['Data'])
-    print(rows)
-
-    num_rows = len(rows)
-    print('Number of data points: ' + str(num_rows))
-    probability = 1
-    negative = 0
-    positive = 0
-    zeros = 0
-    for row in rows:
-        data_point = float(row['Data'])
-        if data_point - mean > 0: 
-            positive += 1
-            probability *= 0.5
-        elif data_point - mean < 0: 
-            negative += 1
-            probability *= 0.5
-        else: zeros += 1
-
-    print("Neg: " + str(negative) + " Pos: " + str(positive) + " Zeros: " + str(zeros));
-    result = probability * math.factorial(negative + positive) / (math.factorial(negative) * math.factorial(positive))
-    result_list = {'mean': mean, 'alpha': alpha, 'result': result}
-    return result_list
 
+    # Signs are counted chunk by chunk, only the counts are kept
+    positive, negative, zeros = 0, 0, 0
+    for chunk in chunks:
+        chunk_positive, chunk_negative, chunk_zeros = sign_counts(chunk['Data'], mean)
+        positive, negative, zeros = positive + chunk_positive, negative + chunk_negative, zeros + chunk_zeros
+    print('Number of data points: ' + str(positive + negative + zeros))
+    test = sign_test_from_counts(positive, negative, zeros)
+
+    print("Neg: " + str(test['negative']) + " Pos: " + str(test['positive']) + " Zeros: " + str(test['zeros']));
+    result = test['two tailed']
+    result_list = {'mean': mean, 'alpha': alpha, 'result': result,
+                   'left tailed': test['left tailed'], 'right tailed': test['right tailed']}
+    return result_list
 
 
 if __name__ == '__main__':
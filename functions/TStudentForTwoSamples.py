@@ -1,8 +1,9 @@
 # Stanisław Zakrzewski 30/01/2022 - t-test paired and unpaired tests
 
-import math
-# Only using this function for getting p_value from table
-from scipy.stats import t
+import numpy as np
+import pandas as pd
+
+from distributions.TStudentDistribution import TStudent
 
 
 def paired_t_test(x_mean, standard_deviation, degrees_of_freedom):
@@ -10,6 +11,7 @@ def paired_t_test(x_mean, standard_deviation, degrees_of_freedom):
     The paired t test provides an hypothesis test of the difference
     between population means for a pair of random samples whose
     differences are approximately normally distributed.
+    All parameters may be NumPy arrays, which are broadcast to test many pairs at once.
 
     Parameters
     -------
@@ -24,17 +26,18 @@ def paired_t_test(x_mean, standard_deviation, degrees_of_freedom):
         t_score: Calculated value of paired t-test
         p_value: Probability value for hypothesis.
     """
-    t_score = x_mean / standard_deviation * math.sqrt(degrees_of_freedom)
-    p_value = 2*(t.cdf(-abs(t_score), degrees_of_freedom))
+    t_score = np.asarray(x_mean, dtype=float) / standard_deviation * np.sqrt(degrees_of_freedom)
+    p_value = 2*(TStudent.cdf(-np.abs(t_score), degrees_of_freedom))
     return t_score, p_value
 
 
-def unpaired_t_test(x1_mean, x2_mean, x1_standard_deviation, x2_standard_deviation, x1_degrees_of_freedom,
-                    x2_degrees_of_freedom):
+def unpaired_t_test(x1_mean, x2_mean, x1_standard_deviation, x2_standard_deviation, x1_degrees_of_freedom=None,
+                    x2_degrees_of_freedom=None, n1=None, n2=None):
     """
     An unpaired t-test (also known as an independent t-test) is a statistical procedure that
     compares the averages/means of two independent or unrelated groups
     to determine if there is a significant difference between the two.
+    All parameters may be NumPy arrays, which are broadcast to test many pairs at once.
 
     Parameters
     -------
@@ -46,20 +49,150 @@ def unpaired_t_test(x1_mean, x2_mean, x1_standard_deviation, x2_standard_deviati
         x2_standard_deviation: The standard deviation is a statistic that measures the data variability.
             It is derived from the square root of the distances between each
             value in the population and the population's mean squared.
-        x1_degrees_of_freedom: The number of values in the final calculation of a statistic that are free to vary.
-        x2_degrees_of_freedom: The number of values in the final calculation of a statistic that are free to vary.
+        x1_degrees_of_freedom: Degrees of freedom of first sample standard deviation, n1 - 1.
+        x2_degrees_of_freedom: Degrees of freedom of second sample standard deviation, n2 - 1.
+        n1: Size of first sample, instead of x1_degrees_of_freedom.
+        n2: Size of second sample, instead of x2_degrees_of_freedom.
 
     Returns
     -------
-        t_score: Calculated value of paired t-test
-        p_value: Probability value for hypothesis.
+        t_score: Calculated value of unpaired (Welch's) t-test
+        p_value: Probability value for hypothesis, with Welch-Satterthwaite degrees of freedom
+            matching the unpooled standard error.
     """
-    t_score = (x1_mean - x2_mean) / math.sqrt(
-        x1_standard_deviation ** 2 / x1_degrees_of_freedom + x2_standard_deviation ** 2 / x2_degrees_of_freedom)
-    p_value = 2 * (t.cdf(-abs(t_score), [x1_degrees_of_freedom, x2_degrees_of_freedom]))
+    assert (x1_degrees_of_freedom is None) != (n1 is None), "give either x1_degrees_of_freedom or n1"
+    assert (x2_degrees_of_freedom is None) != (n2 is None), "give either x2_degrees_of_freedom or n2"
+    n1 = np.add(x1_degrees_of_freedom, 1) if n1 is None else n1
+    n2 = np.add(x2_degrees_of_freedom, 1) if n2 is None else n2
+
+    variance1 = np.asarray(x1_standard_deviation, dtype=float) ** 2 / n1
+    variance2 = np.asarray(x2_standard_deviation, dtype=float) ** 2 / n2
+    t_score = (np.asarray(x1_mean, dtype=float) - x2_mean) / np.sqrt(variance1 + variance2)
+    degrees_of_freedom = (variance1 + variance2) ** 2 \
+        / (variance1 ** 2 / np.subtract(n1, 1) + variance2 ** 2 / np.subtract(n2, 1))
+    p_value = 2 * (TStudent.cdf(-np.abs(t_score), degrees_of_freedom))
     return t_score, p_value
 
 
-# Example
-print(paired_t_test(-4, 1.78, 6))
-print(unpaired_t_test(77, 81, 13.14, 11.71, 6, 6))
+def _t_test_p_value(t_score, degrees_of_freedom, tail):
+    assert tail in ('two tailed', 'left tailed', 'right tailed')
+    if tail == 'left tailed':
+        return TStudent.cdf(t_score, degrees_of_freedom)
+    if tail == 'right tailed':
+        return TStudent.sf(t_score, degrees_of_freedom)
+    return 2 * TStudent.sf(np.abs(t_score), degrees_of_freedom)
+
+
+def two_sample_t_test(sample1, sample2, paired=False, equal_variance=True, tail='two tailed', axis=-1):
+    """
+    T-test of equality of means of two samples given as arrays.
+
+    Parameters
+    -------
+        sample1, sample2: Samples, for many tests at once arrays with samples along `axis`
+            (e.g. one row per cohort).
+        paired: Test of mean of differences sample1 - sample2 (samples must have equal size).
+        equal_variance: Pooled variance (Student) if True, otherwise Welch's test with
+            Welch-Satterthwaite degrees of freedom. Ignored for paired test.
+        tail: 'two tailed', 'left tailed' (H1: mean1 < mean2) or 'right tailed' (H1: mean1 > mean2).
+
+    Returns
+    -------
+        t_score: Calculated value of t-test
+        degrees_of_freedom: Degrees of freedom of t distribution
+        p_value: Probability value for hypothesis.
+    """
+    sample1 = np.asarray(sample1, dtype=float)
+    sample2 = np.asarray(sample2, dtype=float)
+
+    if paired:
+        differences = sample1 - sample2
+        n = differences.shape[axis]
+        degrees_of_freedom = n - 1
+        t_score = differences.mean(axis=axis) / np.sqrt(differences.var(axis=axis, ddof=1) / n)
+    else:
+        n1, n2 = sample1.shape[axis], sample2.shape[axis]
+        variance1 = sample1.var(axis=axis, ddof=1) / n1
+        variance2 = sample2.var(axis=axis, ddof=1) / n2
+        if equal_variance:
+            degrees_of_freedom = n1 + n2 - 2
+            pooled = ((n1 - 1) * n1 * variance1 + (n2 - 1) * n2 * variance2) / degrees_of_freedom
+            standard_error = np.sqrt(pooled * (1.0 / n1 + 1.0 / n2))
+        else:
+            standard_error = np.sqrt(variance1 + variance2)
+            degrees_of_freedom = (variance1 + variance2) ** 2 \
+                / (variance1 ** 2 / (n1 - 1) + variance2 ** 2 / (n2 - 1))
+        t_score = (sample1.mean(axis=axis) - sample2.mean(axis=axis)) / standard_error
+
+    return t_score, degrees_of_freedom, _t_test_p_value(t_score, degrees_of_freedom, tail)
+
+
+def benjamini_hochberg(p_values):
+    """
+    Benjamini-Hochberg adjustment of p-values for false discovery rate control.
+
+    Returns
+    -------
+        q_values: Adjusted p-values, hypotheses with q-value below alpha are rejected
+            with false discovery rate at most alpha. NaN p-values (e.g. of tests with zero
+            variance) are not counted as hypotheses and stay NaN.
+    """
+    p_values = np.asarray(p_values, dtype=float)
+    flat = p_values.ravel()
+    finite = np.flatnonzero(~np.isnan(flat))
+    order = finite[np.argsort(flat[finite])]
+    m = order.size
+    # Running minimum from the largest p-value down keeps adjusted values monotone
+    adjusted = np.minimum.accumulate((flat[order] * m / np.arange(1, m + 1))[::-1])[::-1]
+    q_values = np.full(flat.size, np.nan)
+    q_values[order] = np.minimum(adjusted, 1.0)
+    return q_values.reshape(p_values.shape)
+
+
+def t_tests_from_table(table, adjust=True):
+    """
+    Paired or unpaired t-tests of every row of a table of summary statistics.
+
+    Parameters
+    -------
+        table: DataFrame (or dict of arrays) with columns named after parameters of `paired_t_test`
+            (x_mean, standard_deviation, degrees_of_freedom) or `unpaired_t_test` (x1_mean, x2_mean,
+            x1_standard_deviation, x2_standard_deviation and sample sizes n1, n2 or
+            x1_degrees_of_freedom, x2_degrees_of_freedom).
+        adjust: Add Benjamini-Hochberg adjusted p-values.
+
+    Returns
+    -------
+        DataFrame with t_score, p_value (and q_value) columns added.
+    """
+    result = pd.DataFrame(table).copy()
+    if 'x_mean' in result.columns:
+        t_score, p_value = paired_t_test(result['x_mean'].to_numpy(), result['standard_deviation'].to_numpy(),
+                                         result['degrees_of_freedom'].to_numpy())
+    else:
+        t_score, p_value = unpaired_t_test(**{column: result[column].to_numpy() for column in (
+            'x1_mean', 'x2_mean', 'x1_standard_deviation', 'x2_standard_deviation',
+            'x1_degrees_of_freedom', 'x2_degrees_of_freedom', 'n1', 'n2') if column in result.columns})
+    result['t_score'] = t_score
+    result['p_value'] = p_value
+    if adjust:
+        result['q_value'] = benjamini_hochberg(p_value)
+    return result
+
+
+if __name__ == '__main__':
+    # Example
+    print(paired_t_test(-4, 1.78, 6))
+    print(unpaired_t_test(77, 81, 13.14, 11.71, n1=6, n2=6))
+
+    # Check against scipy
+    import math
+    from scipy import stats
+    assert math.isclose(unpaired_t_test(77, 81, 13.14, 11.71, n1=6, n2=6)[1],
+                        stats.ttest_ind_from_stats(77, 13.14, 6, 81, 11.71, 6, equal_var=False).pvalue, rel_tol=1e-9)
+    assert math.isclose(unpaired_t_test(77, 81, 13.14, 11.71, 5, 13)[1],
+                        stats.ttest_ind_from_stats(77, 13.14, 6, 81, 11.71, 14, equal_var=False).pvalue, rel_tol=1e-9)
+    table = pd.DataFrame({'x1_mean': [77, 77], 'x2_mean': [81, 81], 'x1_standard_deviation': [13.14, 13.14],
+                          'x2_standard_deviation': [11.71, 11.71], 'n1': [6, 6], 'n2': [6, 14]})
+    assert np.allclose(t_tests_from_table(table)['p_value'],
+                       stats.ttest_ind_from_stats(77, 13.14, 6, 81, 11.71, np.array([6, 14]), equal_var=False).pvalue)
@@ -1,65 +1,64 @@
 # Jacek Wolski 12/03/2022 - T-Student test for equality of mean values
 
 
-import csv
 import math
-from scipy.stats import t
+import os
 
-def t_student_test_mean(csv_file='data\TStudentMean.csv'):
+import numpy as np
+
+from dispertion.moment_accumulator import MomentAccumulator
+from distributions.TStudentDistribution import TStudent
+from functions.data_loader import DATA_DIRECTORY, iter_test_data, load_test_data
+
+
+def t_student_test_from_moments(moments1, moments2, alpha):
+    """ Pooled variance t statistic of equality of means from MomentAccumulator of each sample """
+    n1, n2 = moments1.count, moments2.count
+    degrees_of_freedom = n1 + n2 - 2
+    pooled_variance = (moments1.m2 + moments2.m2) / degrees_of_freedom
+    result = (moments1.mean - moments2.mean) / math.sqrt(pooled_variance * (1 / n1 + 1 / n2))
+    t_student = TStudent.ppf(1 - alpha/2, degrees_of_freedom)
+    return {'alpha': alpha, 'result': float(result), 'T-Student': float(t_student),
+            'mean1': float(moments1.mean), 'mean2': float(moments2.mean),
+            'variance1': float(moments1.m2 / (n1 - 1)), 'variance2': float(moments2.m2 / (n2 - 1))}
+
+
+def t_student_test(sample1, sample2, alpha):
+    """ Pooled variance t statistic of equality of means and two tailed critical value """
+    return t_student_test_from_moments(MomentAccumulator.from_values(sample1), MomentAccumulator.from_values(sample2),
+                                       alpha)
+
+
+def t_student_test_mean(csv_file=os.path.join(DATA_DIRECTORY, 'TStudentMean.csv'), chunk_size=None):
     print("T-Student test for equality of mean values.\nData file: " + csv_file)
-    rows = []
-    with open(csv_file, 'r',encoding = 'utf-8-sig') as file:
-        csvreader = csv.DictReader(file, delimiter =';')
-        alpha_row = next(csvreader)
-        alpha = float(alpha_row['Col2'])
-        sample_size_row = next(csvreader)
-        sample1_size = int(sample_size_row['Col1'])
-        sample2_size = int(sample_size_row['Col2'])
-        data_headers_row = next(csvreader)
-        for row in csvreader:
-            rows.append(row)
+    if chunk_size is None:
+        (alpha_row, sample_size_row, data_headers_row), data = load_test_data(csv_file, 3, ['Col1', 'Col2'])
+        chunks = [data]
+    else:
+        (alpha_row, sample_size_row, data_headers_row), chunks = iter_test_data(csv_file, 3, chunk_size,
+                                                                                ['Col1', 'Col2'])
+    alpha = float(alpha_row['Col2'])
+    sample1_size = int(sample_size_row['Col1'])
+    sample2_size = int(sample_size_row['Col2'])
+    # Samples of different sizes share rows, shorter one is padded with blank cells.
+    # Moments are merged chunk by chunk, so only their running state is kept
+    moments1, moments2 = MomentAccumulator(), MomentAccumulator()
+    for chunk in chunks:
+        moments1.update(chunk['Col1'][~np.isnan(chunk['Col1'])])
+        moments2.update(chunk['Col2'][~np.isnan(chunk['Col2'])])
+    assert (moments1.count, moments2.count) == (sample1_size, sample2_size), "sample sizes differ from header"
     print('Alpha: ' + str(alpha))
     print('Data headers: ' + data_headers_row['Col1'] + ' ' + data_headers_row['Col2'])
-    print(rows)
 
     print('Sample size of: ' + data_headers_row['Col1'] + ' is ' + str(sample1_size))
     print('Sample size of: ' + data_headers_row['Col2'] + ' is ' + str(sample2_size))
-    # compute means
-    sum1 = 0.0
-    sum2 = 0.0
-    for row in rows:
-        sample1 = row['Col1']
-        sample2 = row['Col2']
-        if sample1 != '':
-          sum1 = sum1 + float(sample1)
-        if sample2 != '':
-          sum2 = sum2 + float(sample2)
-
-    mean1 = sum1 / sample1_size 
-    mean2 = sum2 / sample2_size
-
-    # compute variances
-    var1 = 0.0
-    var2 = 0.0
-    for row in rows:
-        sample1 = row['Col1']
-        sample2 = row['Col2']
-        if sample1 != '':
-          var1 = var1 + abs(float(sample1) - mean1)**2
-        if sample2 != '':
-          var2 = var2 + abs(float(sample2) - mean2)**2
-    variance1 = var1 / (sample1_size - 1)
-    variance2 = var2 / (sample2_size - 1) 
-    result = (mean1 - mean2) / math.sqrt((var1 + var2)/(sample1_size + sample2_size - 2)*(1.0/sample1_size + 1.0/sample2_size))
-    print('Sample ' + data_headers_row['Col1'] + ' mean is ' + str(mean1) + ' and variance is ' + str(variance1))
-    print('Sample ' + data_headers_row['Col2'] + ' mean is ' + str(mean2) + ' and variance is ' + str(variance2))
-    # look up T-Student table
-    t_student = t.ppf(1 - alpha/2, sample1_size + sample2_size - 2)
-    result_list = {'alpha': alpha, 'result': result, 'T-Student': t_student}
+    test = t_student_test_from_moments(moments1, moments2, alpha)
+    print('Sample ' + data_headers_row['Col1'] + ' mean is ' + str(test['mean1']) + ' and variance is ' + str(test['variance1']))
+    print('Sample ' + data_headers_row['Col2'] + ' mean is ' + str(test['mean2']) + ' and variance is ' + str(test['variance2']))
+    result_list = {'alpha': alpha, 'result': test['result'], 'T-Student': test['T-Student']}
     return result_list
 
 
-
 if __name__ == '__main__':
     test_result = t_student_test_mean()
     print("T-Student Test results: " + str(test_result))
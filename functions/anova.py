@@ -8,8 +8,11 @@
 # ---------------------------------------------------------------------------
 
 import math
+import os
+import sys
 
 from PyQt5 import QtWidgets, QtGui, QtCore  # GUI
+import numpy as np
 import pandas as pd  # Parse CSV files
 
 import statistical_hypothesis
@@ -18,8 +21,13 @@ import statistical_hypothesis
 # Statistics
 # ---------------------------------------------------------------------------
 
+import scipy.sparse as sparse  # Group indicator matrix
 import scipy.stats as stats  # F-critical value
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from distributions.CriticalValues import CRITICAL_VALUES
+from dispertion.moment_accumulator import MomentAccumulator
+
 
 class SnedecorsFDistribution:
 
@@ -45,37 +53,116 @@ class SnedecorsFDistribution:
         # Am I allowed to use this function?
         return stats.f.ppf(alpha, dfn, dfd)
 
+    def critical_value(self, alpha):
+        """
+        Right tailed F-critical value, cached per alpha and degrees of freedom.
+        """
+        return CRITICAL_VALUES.get('F', alpha, 'right tailed', (self.dfn, self.dfd),
+                                   lambda: self.ppf(1 - alpha))
+
     def __instance_ppf(self, alpha):
         return SnedecorsFDistribution.ppf(alpha, self.dfn, self.dfd)
 
 
+def _group_codes(labels, size):
+    """
+    Codes of group labels (in order of first appearance) and the labels, -1 for missing labels.
+    """
+    codes, uniques = pd.factorize(np.asarray(labels).ravel())
+    assert len(codes) == size, "number of labels must equal number of observations"
+    return codes, uniques
+
+
+def group_statistics(values, labels):
+    """
+    Labels (in order of first appearance), sizes, means and sums of squared deviations
+    of groups of a flat array of values, reduced with np.bincount.
+    Observations with missing label (None, NaN) are left out.
+    """
+    values = np.asarray(values, dtype=float).ravel()
+    codes, uniques = _group_codes(labels, len(values))
+    values, codes = values[codes >= 0], codes[codes >= 0]
+
+    n = np.bincount(codes, minlength=len(uniques))
+    means = np.bincount(codes, weights=values, minlength=len(uniques)) / n
+    deviations = values - means[codes]
+    sums_of_squares = np.bincount(codes, weights=deviations * deviations, minlength=len(uniques))
+    return uniques.tolist(), n.tolist(), means.tolist(), sums_of_squares.tolist()
+
+
 class Group:
 
-    def __init__(self, elements, label=''):
-        assert(elements)
+    def __init__(self, elements=None, label='', n=None, mean=None, sum_of_squares=None):
+        """
+        :param list elements: values of the group. Without them the group is described by
+            sufficient statistics `n`, `mean` and `sum_of_squares` (of deviations from group mean) only.
+        """
+        if elements is not None:
+            assert(elements)
+            n, mean, _ = statistical_hypothesis.sample_parameters(elements)
+            sum_of_squares = sum([(element - mean) ** 2 for element in elements])
+        assert(n > 0)
 
         self.elements = elements
         self.label = label
 
-        self.n, self.mean, self.std = statistical_hypothesis.sample_parameters(
-            elements)
+        self.n, self.mean, self.sum_of_squares = n, mean, sum_of_squares
+        self.std = math.sqrt(sum_of_squares / (n - 1)) if n > 1 else 0.0
+
+    @classmethod
+    def from_statistics(cls, n, mean, sum_of_squares, label=''):
+        """
+        Group described by sufficient statistics only, elements are not kept.
+        """
+        return cls(None, label, n, mean, sum_of_squares)
+
+
+class GroupAccumulator(MomentAccumulator):
+    """
+    MomentAccumulator of a group with its label, mergeable across shards.
+    Can be used in place of Group in Anova.
+    """
+
+    def __init__(self, label='', count=0, mean=0.0, m2=0.0, m3=0.0, m4=0.0):
+        super().__init__(count, mean, m2, m3, m4)
+        self.label = label
+
+    @classmethod
+    def from_values(cls, values, label=''):
+        return cls(label).update(values)
+
+    @property
+    def n(self):
+        return self.count
+
+    @property
+    def sum_of_squares(self):
+        return self.m2
 
-        self.sum_of_squares = sum([(element - self.mean) **
-                                   2 for element in self.elements])
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def copy(self):
+        return GroupAccumulator(self.label, self.count, self.mean, self.m2, self.m3, self.m4)
 
 
 class Anova:
 
     def __init__(self, groups):
+        """
+        :param groups: objects with n, mean and sum_of_squares, e.g. Group.
+        """
         assert(groups)
 
+        self.groups = groups
         self.k = len(groups)
         assert(self.k > 1)
 
         self.N = sum([group.n for group in groups])
         self.F = SnedecorsFDistribution(self.k, self.N)
 
-        self.mean = sum([sum(group.elements) for group in groups]) / self.N
+        self.mean = sum([group.n * group.mean for group in groups]) / self.N
 
         self.sum_of_squares_between = sum(
             [group.n * (group.mean - self.mean) ** 2 for group in groups])
@@ -88,13 +175,26 @@ class Anova:
         self.total_df = self.N - 1
         self.total_sum_of_squares = self.sum_of_squares_between + self.sum_of_squares_within
 
+    @classmethod
+    def from_labels(cls, values, labels):
+        """
+        Anova of a flat array of values, each belonging to the group given by its label.
+        Groups are ordered by first appearance of their labels, values with missing label are left out.
+        """
+        return cls([Group.from_statistics(n, mean, sum_of_squares, label)
+                    for label, n, mean, sum_of_squares in zip(*group_statistics(values, labels))])
+
+    @classmethod
+    def from_data_frame(cls, data_frame, value_column, group_column):
+        return cls.from_labels(data_frame[value_column].to_numpy(), data_frame[group_column].to_numpy())
+
     def f_value(self):
         assert(self.mean_sum_of_squares_within)
 
         return self.mean_sum_of_squares_between / self.mean_sum_of_squares_within
 
     def f_alpha(self, alpha):
-        return self.F.ppf(1 - alpha)
+        return self.F.critical_value(alpha)
 
     def f_test(self, alpha):
         """
@@ -102,6 +202,99 @@ class Anova:
         """
         return self.f_value() > self.f_alpha(alpha)
 
+
+class OnlineAnova:
+    """
+    One-way ANOVA over a stream of (value, label) observations, only GroupAccumulator per label is kept.
+    States of shards can be merged, F-ratio is available at any time.
+    """
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, value, label):
+        self.__group(label).add(value)
+        return self
+
+    def update(self, values, labels):
+        """ Batch of observations, split per label with a single stable sort before merging.
+            Observations with missing label (None, NaN) are left out.
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        codes, uniques = _group_codes(labels, len(values))
+        values, codes = values[codes >= 0], codes[codes >= 0]
+        bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1]
+        for label, group_values in zip(uniques.tolist(), np.split(values[np.argsort(codes, kind='stable')], bounds)):
+            self.__group(label).update(group_values)
+        return self
+
+    def merge(self, other):
+        for label, group in other.groups.items():
+            self.__group(label).merge(group)
+        return self
+
+    def anova(self):
+        """ Anova of observations so far """
+        return Anova([group.copy() for group in self.groups.values()])
+
+    def f_value(self):
+        return self.anova().f_value()
+
+    def f_test(self, alpha):
+        """
+        Returns True if H0 is rejected.
+        """
+        return self.anova().f_test(alpha)
+
+    def __group(self, label):
+        if label not in self.groups:
+            self.groups[label] = GroupAccumulator(label)
+        return self.groups[label]
+
+
+def anova_many(matrix, groups):
+    """
+    One-way ANOVA of every column of `matrix` with the same grouping of rows.
+
+    :param matrix: 2D array or DataFrame, one row per observation and one column per response.
+    :param groups: group label of each row, rows with missing label (None, NaN) are left out.
+    :return: DataFrame with one row per column of `matrix` (named after DataFrame columns).
+    """
+    columns = matrix.columns if isinstance(matrix, pd.DataFrame) else None
+    values = np.asarray(matrix, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    codes, uniques = _group_codes(groups, values.shape[0])
+    values, codes = values[codes >= 0], codes[codes >= 0]
+
+    k, N = len(uniques), values.shape[0]
+    assert(k > 1)
+    F = SnedecorsFDistribution(k, N)
+
+    # Group sums of all columns at once: (k x N) indicator matrix times (N x columns) values
+    indicator = sparse.csr_matrix((np.ones(N), (codes, np.arange(N))), shape=(k, N))
+    n = np.bincount(codes, minlength=k)
+    means = (indicator @ values) / n[:, np.newaxis]
+    mean = n @ means / N
+
+    sum_of_squares_between = n @ (means - mean) ** 2
+    sum_of_squares_within = np.sum((values - means[codes]) ** 2, axis=0)
+    mean_sum_of_squares_between = sum_of_squares_between / F.dfn
+    mean_sum_of_squares_within = sum_of_squares_within / F.dfd
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f_value = mean_sum_of_squares_between / mean_sum_of_squares_within
+
+    return pd.DataFrame({
+        'df_between': F.dfn,
+        'df_within': F.dfd,
+        'sum_of_squares_between': sum_of_squares_between,
+        'sum_of_squares_within': sum_of_squares_within,
+        'mean_sum_of_squares_between': mean_sum_of_squares_between,
+        'mean_sum_of_squares_within': mean_sum_of_squares_within,
+        'f_value': f_value,
+        'p_value': stats.f.sf(f_value, F.dfn, F.dfd),
+    }, index=columns)
+
 # ---------------------------------------------------------------------------
 # Graphical User Interface
 # ---------------------------------------------------------------------------
@@ -1,25 +1,124 @@
+import os
+import sys
+import threading
+from typing import Iterable, List, Tuple, Union
+
+import numpy as np
 import pandas as pd
+import scipy.sparse as sparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from distributions.Chi2Distribution import Chi2
+from distributions.CriticalValues import CRITICAL_VALUES
+from functions.data_loader import encode_categories
+
+CROSSTAB_CHUNK_SIZE = 1 << 20
+
+
+def chi_square_independence(counts) -> Tuple[np.ndarray, int, np.ndarray]:
+    """
+    Chi2 test of independence of rows and columns of a contingency table of counts.
+
+    Rows and columns with zero total are left out of the test and of degrees of freedom. Tables with fewer
+    than two nonempty rows or columns have 0 degrees of freedom, test value 0 and p-value 1.
+
+    :param counts: 2D table (dense or scipy.sparse), or 3D stack of tables of the same shape (tested separately).
+    :return: test value, degrees of freedom and p-value (arrays over the stack for 3D input).
+    """
+    if sparse.issparse(counts):
+        return _sparse_chi_square_independence(counts)
+    counts = np.asarray(counts, dtype=float)
+    assert counts.ndim in (2, 3), "2D table or 3D stack of tables expected"
+
+    row_totals = counts.sum(axis=-1, keepdims=True)
+    col_totals = counts.sum(axis=-2, keepdims=True)
+    dof = _degrees_of_freedom(np.count_nonzero(row_totals, axis=(-2, -1)),
+                              np.count_nonzero(col_totals, axis=(-2, -1)))
+
+    expected = row_totals * col_totals / np.maximum(row_totals.sum(axis=-2, keepdims=True), 1)
+    nonempty = expected > 0  # Counts of empty rows and columns are 0 as well, so they add nothing
+    test_value = np.where(nonempty, (counts - expected) ** 2 / np.where(nonempty, expected, 1), 0).sum(axis=(-2, -1))
+    if counts.ndim == 2:
+        dof = int(dof)
+    return test_value, dof, _p_value(test_value, dof)
+
+
+def _degrees_of_freedom(nonempty_rows, nonempty_cols):
+    return np.maximum(nonempty_rows - 1, 0) * np.maximum(nonempty_cols - 1, 0)
+
+
+def _p_value(test_value, dof):
+    if np.ndim(dof) == 0:
+        return Chi2.sf(test_value, dof) if dof > 0 else 1.0
+    return np.where(dof > 0, Chi2.sf(test_value, np.maximum(dof, 1)), 1.0)
+
+
+def _sparse_chi_square_independence(counts) -> Tuple[float, int, float]:
+    # Sum of (O - E)^2 / E equals sum of O^2 / E - N, so only nonzero counts are visited
+    counts = sparse.coo_matrix(counts, dtype=float)
+    counts.eliminate_zeros()
+
+    row_totals = np.asarray(counts.sum(axis=1)).ravel()
+    col_totals = np.asarray(counts.sum(axis=0)).ravel()
+    dof = int(_degrees_of_freedom(np.count_nonzero(row_totals), np.count_nonzero(col_totals)))
+
+    total = row_totals.sum()
+    expected = row_totals[counts.row] * col_totals[counts.col] / total
+    test_value = max(0.0, float(np.sum(counts.data ** 2 / expected)) - total) if dof > 0 else 0.0
+    return test_value, dof, float(_p_value(test_value, dof))
+
+
+def _record_chunks(source, columns: List[str], chunk_size: int, delimiter: str) -> Iterable[pd.DataFrame]:
+    if isinstance(source, pd.DataFrame):
+        yield source[columns]
+    elif isinstance(source, (str, os.PathLike)) and str(source).endswith('.parquet'):
+        import pyarrow.parquet as pq  # Optional, needed for Parquet input only
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    elif isinstance(source, (str, os.PathLike)):
+        yield from pd.read_csv(source, delimiter=delimiter, usecols=columns, chunksize=chunk_size)
+    else:  # Iterable of DataFrame chunks
+        for chunk in source:
+            yield chunk[columns]
+
+
+def crosstab(source, row_column: str, col_column: str, sparse_output: bool = False,
+             chunk_size: int = CROSSTAB_CHUNK_SIZE, delimiter: str = ',') \
+        -> Tuple[Union[np.ndarray, sparse.csr_matrix], list, list]:
+    """
+    Contingency table of counts of (row category, column category) records, built chunk by chunk.
+
+    :param source: path to csv or Parquet (needs pyarrow) file, DataFrame or iterable of DataFrame chunks.
+    :param sparse_output: return scipy.sparse.csr_matrix, for many categories with few combinations.
+    :return: table usable by chi_square_independence, row categories and column categories
+        (in order of first appearance). Records with missing category are skipped.
+    """
+    row_categories, col_categories = {}, {}
+    table = sparse.csr_matrix((0, 0), dtype=np.int64) if sparse_output else np.zeros((0, 0), dtype=np.int64)
+
+    for chunk in _record_chunks(source, [row_column, col_column], chunk_size, delimiter):
+        # Incomplete records are dropped first, so categories seen only in them are not registered
+        chunk = chunk.dropna()
+        rows = encode_categories(chunk[row_column].to_numpy(), row_categories)
+        cols = encode_categories(chunk[col_column].to_numpy(), col_categories)
+        shape = (len(row_categories), len(col_categories))
+
+        if sparse_output:
+            table.resize(shape)
+            table = table + sparse.csr_matrix((np.ones(rows.size, dtype=np.int64), (rows, cols)), shape=shape)
+        else:
+            table = np.pad(table, ((0, shape[0] - table.shape[0]), (0, shape[1] - table.shape[1])))
+            table += np.bincount(rows * shape[1] + cols, minlength=shape[0] * shape[1]).reshape(shape)
+
+    return table, list(row_categories), list(col_categories)
+
 
 def chi_square_independence_test(filename: str):
     assert '.csv' in filename, "csv file should be loaded"
     df = pd.read_csv(filename, delimiter=',', index_col=0)
 
-    (number_of_rows, number_of_cols) = df.shape
-    dof = (number_of_rows - 1) * (number_of_cols - 1)  # Degrees of freedom
-
-    df['row_total'] = df.iloc[:, 0:len(df.columns)].sum(axis=1)
-    df_sum = df.sum()
-
-    for col in range(number_of_cols):
-        expected_col_name = df.columns[col] + '_expected_value'
-        df[expected_col_name] = df['row_total'] * df_sum[col] / df_sum[-1]
-        df[expected_col_name + '_temp'] = df[expected_col_name]
-        df[expected_col_name] = df[expected_col_name] - df.iloc[:, col]
-        df[expected_col_name] **= 2
-        df[expected_col_name] /= df[expected_col_name + '_temp']
-        df.drop([expected_col_name + '_temp'], inplace=True, axis=1)
-    test_value = df.iloc[:, number_of_cols + 1:number_of_cols * 2 + 1].sum(axis=0).sum()
-    return test_value, dof
+    test_value, dof, _ = chi_square_independence(df.to_numpy())
+    return float(test_value), dof
 
 
 possible_significance_levels = [
@@ -40,10 +139,38 @@ possible_significance_levels = [
     '0.001'
 ]
 
+CHI2_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'chi2Table.csv')
+
+_chi2_table = None
+_chi2_table_lock = threading.Lock()
+
+
+def _get_chi2_table() -> dict:
+    """
+    Critical values table {(dof, significance level): value}, read from csv once per process.
+    """
+    global _chi2_table
+    if _chi2_table is None:
+        with _chi2_table_lock:
+            if _chi2_table is None:
+                df_chi2 = pd.read_csv(CHI2_TABLE_PATH, index_col=0, delimiter=',')
+                _chi2_table = {(int(dof), float(level)): float(value)
+                               for level, column in df_chi2.items()
+                               for dof, value in column.items()}
+    return _chi2_table
+
+
 def get_chi_square_distribution_value(dof: int, significance_level: str):
-    df_chi2 = pd.read_csv('static/chi2Table.csv', index_col=0, delimiter=',')
-    val =df_chi2.loc[dof, significance_level]
-    return val
+    assert dof > 0, "chi2 critical value needs at least 1 degree of freedom (table with two nonempty rows and columns)"
+    alpha = float(significance_level)
+
+    def _lookup():
+        value = _get_chi2_table().get((dof, alpha))
+        if value is None:  # Not tabulated, compute exact value
+            value = Chi2.isf(alpha, dof)
+        return value
+
+    return CRITICAL_VALUES.get('chi2', alpha, 'right tailed', (dof,), _lookup)
 
 
 print("Algorithm loaded: Chi2 independence test")
@@ -0,0 +1,71 @@
+# Loader of test input files used by SignTestMean, WilcoxonTestPairs and TStudentMean:
+# - first line has column names
+# - a few parameter rows follow (mean, alpha, sample sizes, data headers...)
+# - the rest is numeric data, read column-wise into NumPy arrays (blank cells become NaN),
+#   whole or as an iterator of chunks
+# Also integer coding of categorical columns read in chunks (chi2 tests)
+
+import csv
+import itertools
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+
+def _read_parameters(path: str, parameter_rows: int, delimiter: str) -> Tuple[List[Dict[str, str]], List[str]]:
+    with open(path, 'r', encoding='utf-8-sig') as file:
+        csvreader = csv.DictReader(file, delimiter=delimiter)
+        parameters = list(itertools.islice(csvreader, parameter_rows))
+        names = csvreader.fieldnames
+    assert len(parameters) == parameter_rows, "file has fewer rows than expected parameters"
+    return parameters, names
+
+
+def _read_data(path: str, parameter_rows: int, names: List[str], columns: List[str], delimiter: str,
+               chunk_size: Optional[int]):
+    return pd.read_csv(path, delimiter=delimiter, skiprows=parameter_rows + 1, header=None, names=names,
+                       usecols=columns, dtype={column: float for column in columns}, encoding='utf-8-sig',
+                       chunksize=chunk_size)
+
+
+def load_test_data(path: str, parameter_rows: int, columns: Optional[Sequence[str]] = None,
+                   delimiter: str = ';') -> Tuple[List[Dict[str, str]], Dict[str, np.ndarray]]:
+    """
+    :param int parameter_rows: number of rows between column names and data.
+    :param columns: data columns to read, all by default.
+    :return: parameter rows as {column name: text} and {column name: float array} of data.
+    """
+    parameters, names = _read_parameters(path, parameter_rows, delimiter)
+    columns = list(columns or names)
+    data = _read_data(path, parameter_rows, names, columns, delimiter, None)
+    return parameters, {column: data[column].to_numpy() for column in columns}
+
+
+def iter_test_data(path: str, parameter_rows: int, chunk_size: int, columns: Optional[Sequence[str]] = None,
+                   delimiter: str = ';') -> Tuple[List[Dict[str, str]], Iterator[Dict[str, np.ndarray]]]:
+    """
+    As `load_test_data`, but data is read lazily in chunks of `chunk_size` rows, so large files can be
+    reduced chunk by chunk without holding whole columns in memory.
+
+    :return: parameter rows as {column name: text} and iterator of {column name: float array} chunks.
+    """
+    assert chunk_size > 0, "chunk size must be positive"
+    parameters, names = _read_parameters(path, parameter_rows, delimiter)
+    columns = list(columns or names)
+    chunks = _read_data(path, parameter_rows, names, columns, delimiter, chunk_size)
+    return parameters, ({column: chunk[column].to_numpy() for column in columns} for chunk in chunks)
+
+
+def encode_categories(values, categories: dict) -> np.ndarray:
+    """
+    Integer codes of values, new values get next codes in `categories` {value: code}, so codes stay
+    consistent across chunks. Missing values get -1.
+    """
+    codes, uniques = pd.factorize(values)
+    mapping = np.array([categories.setdefault(value, len(categories)) for value in uniques.tolist()] + [-1],
+                       dtype=np.int64)
+    return mapping[codes]
@@ -0,0 +1,48 @@
+# Ranking of samples for nonparametric tests
+# - ranks start at 1
+# - ties get average, minimum, maximum or dense rank, 'ordinal' breaks them by position
+# - sizes of tie groups are returned for variance corrections
+from typing import Tuple
+
+import numpy as np
+
+RANK_METHODS = ('average', 'min', 'max', 'dense', 'ordinal')
+
+
+def rank(values, method: str = 'average') -> Tuple[np.ndarray, np.ndarray]:
+    """ Ranks of `values` and sizes of groups of equal values (in ascending order of values).
+        Values are sorted once, so ranking is O(n log n).
+    """
+    assert method in RANK_METHODS, "method must be one of " + ', '.join(RANK_METHODS)
+    values = np.asarray(values).ravel()
+    size = values.size
+
+    order = np.argsort(values, kind='stable')
+    sorted_values = values[order]
+    is_first = np.ones(size, dtype=bool)
+    is_first[1:] = sorted_values[1:] != sorted_values[:-1]
+    starts = np.flatnonzero(is_first)
+    tie_sizes = np.diff(np.append(starts, size))
+
+    if method == 'ordinal':
+        sorted_ranks = np.arange(1, size + 1, dtype=float)
+    else:
+        if method == 'average':
+            group_ranks = starts + (tie_sizes + 1) / 2
+        elif method == 'min':
+            group_ranks = starts + 1.0
+        elif method == 'max':
+            group_ranks = (starts + tie_sizes).astype(float)
+        else:
+            group_ranks = np.arange(1, starts.size + 1, dtype=float)
+        sorted_ranks = np.repeat(group_ranks, tie_sizes)
+
+    ranks = np.empty(size, dtype=float)
+    ranks[order] = sorted_ranks
+    return ranks, tie_sizes
+
+
+def tie_correction(tie_sizes) -> float:
+    """ Sum of t^3 - t over tie groups, used to correct variance of rank statistics """
+    tie_sizes = np.asarray(tie_sizes, dtype=float)
+    return float(np.sum(tie_sizes ** 3 - tie_sizes))
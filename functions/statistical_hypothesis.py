@@ -12,6 +12,8 @@ import itertools
 import math
 import enum
 import operator
+import os
+import sys
 
 from PyQt5 import QtWidgets, QtGui, QtCore  # GUI
 import pyqtgraph as pg  # Plot distribution function
@@ -23,6 +25,10 @@ import pandas as pd  # Parse CSV files
 
 import scipy.stats as stats  # Z-critical value
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from distributions.TStudentDistribution import TStudent  # t-critical value and density
+from distributions.CriticalValues import CRITICAL_VALUES
+
 
 class NormalDistribution:
     def __init__(self, mean=0, var=1):
@@ -41,6 +47,13 @@ class NormalDistribution:
         # Am I allowed to use this function?
         return stats.norm.ppf(alpha)
 
+    @staticmethod
+    def parameters():
+        """
+        Parameters which critical values depend on.
+        """
+        return ()
+
     @staticmethod
     def pdf(x, mean=0, std=1):
         """
@@ -77,15 +90,14 @@ class StudentsTDistribution:
         :param int df: degrees of freedom.
         """
         assert(df > 0)
-        # Am I allowed to use this function?
-        return stats.t.ppf(alpha, df)
+        return TStudent.ppf(alpha, df)
 
     @staticmethod
     def pdf(x, df):
         """
         Probability density function.
         """
-        return math.gamma((df + 1) / 2) / (math.sqrt(math.pi * df) * math.gamma(df / 2) * (1 + x ** 2 / df) ** ((df + 1) / 2))
+        return TStudent.pdf(x, df)
 
     @staticmethod
     def symbol():
@@ -95,6 +107,12 @@ class StudentsTDistribution:
     def scale_symbol():
         return 's'
 
+    def parameters(self):
+        """
+        Parameters which critical values depend on.
+        """
+        return (self.df,)
+
     def __instance_ppf(self, alpha):
         return StudentsTDistribution.ppf(alpha, self.df)
 
@@ -125,9 +143,10 @@ class TailTest(enum.Enum):
 
     def z_alpha(self, distribution, alpha):
         """
-        Z-critical value.
+        Z-critical value, cached per distribution, alpha and tail.
         """
-        return distribution.ppf(self.value.get_alpha(alpha))
+        return CRITICAL_VALUES.get(distribution.symbol(), alpha, self.name(), distribution.parameters(),
+                                   lambda: distribution.ppf(self.value.get_alpha(alpha)))
 
     def __call__(self, distribution, alpha, z):
         return self.value.condition(z, self.z_alpha(distribution, alpha))
@@ -1021,9 +1040,9 @@ class Controller:
         except ValueError as e:
             QtWidgets.QMessageBox.critical(
                 self.window, 'Error', f'Invalid configuration: {str(e)}')
-        except OverflowError as e:
+        except OverflowError:
             QtWidgets.QMessageBox.critical(
-                self.window, 'Error', f"Caclulation overflow. Tip: Student's t distribution is likely to overflow for a high sample size (gamma function).")
+                self.window, 'Error', 'Calculation overflow: value out of range.')
 
     def __create_hypotheses(self):
         self.H0 = HypothesisWidget(
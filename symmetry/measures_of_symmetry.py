@@ -1,8 +1,10 @@
 # Kacper Kubicki 23.02.2022
 
-from math import sqrt
 from typing import List, Tuple
 
+from dispertion.moment_accumulator import MomentAccumulator
+from dispertion.positional_methods import PositionalMethods
+
 
 def nonparametric_skew(data: List[float]) -> Tuple[float, str]:
     """
@@ -17,9 +19,10 @@ def nonparametric_skew(data: List[float]) -> Tuple[float, str]:
         S: Calculated nonparametric skewness
         info: Additional information about the skewness direction
     """
-    arth_mean = sum(data) / len(data)
-    std_deviation = sqrt(sum([(sample - arth_mean) ** 2 for sample in data]) / len(data))
-    median = sorted(data)[(len(data)-1)//2] if len(data) % 2 else ((sorted(data)[(len(data)-1)//2] + sorted(data)[((len(data)-1)//2)+1]) / 2.0)
+    moments = MomentAccumulator.from_values(data)
+    arth_mean = moments.mean
+    std_deviation = moments.standard_deviation()
+    median = PositionalMethods().median(data)
     S = (arth_mean - median) / std_deviation
 
     if S > 0:
@@ -36,7 +39,7 @@ def standardized_central_moment(data: List[float], r: int) -> Tuple[float, str]:
     """
     Parameters
     ----------
-    data
+    data: samples or MomentAccumulator already filled with them (e.g. by dispertion.parallel_moments)
     r: which central moment we want to calculate, has to be between 1 and 4
 
     Returns
@@ -46,10 +49,8 @@ def standardized_central_moment(data: List[float], r: int) -> Tuple[float, str]:
     """
     assert (1 <= r <= 4)
 
-    arth_mean = sum(data) / len(data)
-    std_deviation = sqrt(sum([(sample - arth_mean) ** 2 for sample in data]) / len(data))
-    arth_mean_of_deviations_from_mean = sum([(sample - arth_mean) ** r for sample in data]) / len(data)
-    standardized_moment = arth_mean_of_deviations_from_mean / (std_deviation ** r)
+    moments = data if isinstance(data, MomentAccumulator) else MomentAccumulator.from_values(data)
+    standardized_moment = moments.standardized_moment(r)
     info = ""
 
     if r == 3: